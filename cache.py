@@ -0,0 +1,131 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy
+from scipy.sparse import issparse
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+def topology_fingerprint(network, weight='weight'):
+    """
+    Returns a digest identifying the node order and weighted edge set of a network
+
+    Two networks share a fingerprint exactly when create_sparse_matrix would build
+    the same matrix for both, so it is safe to use as a cache key for anything
+    derived from the topology alone.
+
+    :param network: A networkx graph
+    :param weight: The edge attribute read as an edge weight
+    :returns: A hex digest string
+    """
+    nodes = network.nodes()
+    index = {node_id: i for i, node_id in enumerate(nodes)}
+    edges = network.edges(data=weight, default=1)
+    digest = hashlib.sha1()
+    digest.update(repr(nodes).encode('utf-8'))
+    digest.update(type(network).__name__.encode('utf-8'))
+    digest.update(numpy.fromiter((index[u] for u, _, _ in edges), dtype=numpy.int64, count=len(edges)).tobytes())
+    digest.update(numpy.fromiter((index[v] for _, v, _ in edges), dtype=numpy.int64, count=len(edges)).tobytes())
+    digest.update(numpy.fromiter((w for _, _, w in edges), dtype=numpy.float64, count=len(edges)).tobytes())
+    return digest.hexdigest()
+
+def nbytes(value):
+    """
+    Estimates the memory held by a cached value
+
+    :param value: A sparse matrix, an object with an nbytes attribute, or a tuple, list or dict of them
+    :returns: The size in bytes, 0 for values of unknown size
+    """
+    if issparse(value):
+        value = value.tocsc() if value.format not in ('csc', 'csr') else value
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if hasattr(value, 'nbytes'):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    return 0
+
+class LRUCache(object):
+    """
+    A thread safe least recently used cache bounded by the total size of its values
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, sizeof=nbytes):
+        """
+        Construct a new 'LRUCache' object
+
+        :param max_bytes: The memory budget, least recently used entries are evicted beyond it
+        :param sizeof: A function estimating the size in bytes of a value
+        """
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            value, size = self._entries.pop(key)
+            self._entries[key] = (value, size)
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def get_or_create(self, key, factory):
+        """
+        Returns the cached value for key, calling factory to create and cache it on a miss
+
+        :param key: A hashable cache key
+        :param factory: A function with no arguments that builds the value
+        :returns: The cached or newly built value
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, factory())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,53 @@
+import unittest
+
+import networkx
+import numpy
+
+from cache import LRUCache, topology_fingerprint
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_or_create(self):
+        cache = LRUCache()
+        calls = []
+        factory = lambda: calls.append(1) or numpy.ones(10)
+        first = cache.get_or_create('a', factory)
+        second = cache.get_or_create('a', factory)
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_eviction(self):
+        cache = LRUCache(max_bytes=2 * 80)
+        cache.put('a', numpy.ones(10))
+        cache.put('b', numpy.ones(10))
+        cache.get('a')
+        cache.put('c', numpy.ones(10))
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['bytes'], 2 * 80)
+
+    def test_oversized_value_not_cached(self):
+        cache = LRUCache(max_bytes=8)
+        cache.put('a', numpy.ones(10))
+        self.assertEqual(len(cache), 0)
+
+class TestTopologyFingerprint(unittest.TestCase):
+
+    def test_fingerprint(self):
+        n1 = networkx.path_graph(10)
+        n2 = networkx.path_graph(10)
+        for node_id in n2.nodes():
+            n2.node[node_id]['diffusion_input'] = 1.0
+        self.assertEqual(topology_fingerprint(n1), topology_fingerprint(n2))
+        n2.add_edge(0, 5)
+        self.assertNotEqual(topology_fingerprint(n1), topology_fingerprint(n2))
+        n2.remove_edge(0, 5)
+        n2[0][1]['weight'] = 2.0
+        self.assertNotEqual(topology_fingerprint(n1), topology_fingerprint(n2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import multiprocessing
+
+import numpy
+from scipy.sparse.csgraph import connected_components
+
+from cache import nbytes
+
+PARALLEL_MIN_NODES = 1000
+DEFAULT_WORKERS = multiprocessing.cpu_count()
+
+class Components(object):
+    """
+    The connected components of a network, found once per topology
+
+    Components of at least min_block_size nodes keep their block of the laplacian,
+    so requests landing in them skip slicing it out again.
+    """
+
+    def __init__(self, labels, blocks):
+        """
+        Construct a new 'Components' object
+
+        :param labels: An array with the component of every node
+        :param blocks: A dict from the label of every large component to a tuple of its node indices and laplacian block
+        """
+        self.labels = labels
+        self.blocks = blocks
+        self.count = int(labels.max()) + 1 if len(labels) else 0
+
+    @property
+    def nbytes(self):
+        return self.labels.nbytes + nbytes(self.blocks)
+
+def find_components(laplacian, min_block_size=PARALLEL_MIN_NODES):
+    """
+    Splits a laplacian into its weakly connected components
+
+    :param laplacian: A square sparse laplacian matrix
+    :param min_block_size: The least number of nodes of a component that keeps its laplacian block
+    :returns: A Components
+    """
+    _, labels = connected_components(laplacian, directed=True, connection='weak')
+    sizes = numpy.bincount(labels)
+    blocks = {}
+    if len(sizes) > 1:
+        for label in numpy.flatnonzero(sizes >= min_block_size):
+            indices = numpy.flatnonzero(labels == label)
+            blocks[int(label)] = (indices, laplacian[indices, :][:, indices])
+    return Components(labels, blocks)
+
+def diffuse_components(laplacian, components, heat, times, diffuse, executor=None):
+    """
+    Diffuses heat in only the components holding some of it
+
+    Heat never crosses between components, so cold components stay at zero without
+    any computation. Every large heated component is diffused on its own block,
+    on the executor when there are several, and the small heated components are
+    diffused together on one block.
+
+    :param laplacian: A square sparse laplacian matrix
+    :param components: The Components of laplacian
+    :param heat: A heat vector, or a matrix with one heat vector per column
+    :param times: An increasing sequence of non negative diffusion times
+    :param diffuse: A function of a laplacian, a heat, times and the label of the component, -1 for the whole laplacian and None for the small components together, returning the diffused heat for each time along its first axis
+    :param executor: A concurrent.futures executor for the large components, None to diffuse them in turn
+    :returns: An array with the diffused heat for each time along its first axis
+    """
+    heat = numpy.asarray(heat)
+    if components.count <= 1:
+        return diffuse(laplacian, heat, times, -1)
+    hot = heat != 0 if heat.ndim == 1 else (heat != 0).any(axis=1)
+    heated = numpy.unique(components.labels[hot])
+    tasks = [(int(label),) + components.blocks[label] for label in heated if label in components.blocks]
+    small = [label for label in heated if label not in components.blocks]
+    if small:
+        selected = numpy.zeros(components.count, dtype=bool)
+        selected[small] = True
+        indices = numpy.flatnonzero(selected[components.labels])
+        tasks.append((None, indices, laplacian[indices, :][:, indices]))
+    work = lambda task: diffuse(task[2], heat[task[1]], times, task[0])
+    if executor is not None and len(tasks) > 1:
+        diffused_heats = list(executor.map(work, tasks))
+    else:
+        diffused_heats = [work(task) for task in tasks]
+    result = numpy.zeros((len(times),) + heat.shape)
+    for (_, indices, _), diffused_heat in zip(tasks, diffused_heats):
+        result[:, indices] = diffused_heat
+    return result
@@ -0,0 +1,60 @@
+import unittest
+from concurrent import futures
+
+import networkx
+import numpy
+from scipy.sparse import csc_matrix
+
+import solvers
+from components import diffuse_components, find_components
+
+class TestComponents(unittest.TestCase):
+
+    def setUp(self):
+        network = networkx.disjoint_union_all([
+            networkx.gnm_random_graph(40, 120, seed=1),
+            networkx.gnm_random_graph(30, 90, seed=2),
+            networkx.path_graph(3),
+            networkx.path_graph(2),
+            networkx.empty_graph(1),
+        ])
+        self.laplacian = csc_matrix(networkx.laplacian_matrix(network, nodelist=range(76)), dtype=float)
+        self.times = numpy.array([0.5, 1.0])
+        self.diffuse = lambda laplacian, heat, times, label: solvers.diffuse(laplacian, heat, times)
+
+    def test_find_components(self):
+        components = find_components(self.laplacian, min_block_size=30)
+        self.assertEqual(components.count, 5)
+        self.assertEqual(sorted(components.blocks), [0, 1])
+        indices, block = components.blocks[1]
+        self.assertEqual(list(indices), list(range(40, 70)))
+        self.assertEqual(block.shape, (30, 30))
+        self.assertGreater(components.nbytes, components.labels.nbytes)
+
+    def test_diffuse_components(self):
+        components = find_components(self.laplacian, min_block_size=30)
+        heat = numpy.zeros((76, 2))
+        heat[[3, 50], 0] = 1.0
+        heat[71, 1] = 2.0
+        expected = solvers.diffuse(self.laplacian, heat, self.times)
+        executor = futures.ThreadPoolExecutor(2)
+        for pool in (None, executor):
+            actual = diffuse_components(self.laplacian, components, heat, self.times, self.diffuse, pool)
+            self.assertTrue(numpy.allclose(actual, expected))
+        executor.shutdown()
+
+    def test_cold_components_skipped(self):
+        components = find_components(self.laplacian, min_block_size=30)
+        sizes = []
+        def diffuse(laplacian, heat, times, label):
+            sizes.append((label, laplacian.shape[0]))
+            return self.diffuse(laplacian, heat, times, label)
+        heat = numpy.zeros(76)
+        heat[[71, 73]] = 1.0
+        actual = diffuse_components(self.laplacian, components, heat, self.times, diffuse)
+        self.assertEqual(sizes, [(None, 5)])
+        self.assertTrue(numpy.all(actual[:, :70] == 0))
+        self.assertTrue(numpy.allclose(actual.sum(axis=1), 2.0))
+
+if __name__ == '__main__':
+    unittest.main()
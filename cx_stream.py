@@ -0,0 +1,92 @@
+import networkx
+
+import cxmate
+from cxmate.service import NetworkElementBuilder
+
+VALUE_TYPES = {
+    'boolean': lambda value: str(value).lower() == 'true',
+    'double': float,
+    'float': float,
+    'integer': int,
+    'long': int,
+}
+
+def read_networkx(ele_iter, multigraph=False, directed=False):
+    """
+    Reads the first network of a CX element stream into networkx
+
+    Works like cxmate.Adapter.read_networkx, but applies edge attributes in one
+    pass once the stream is read, rather than all of them again after every
+    element, and can keep parallel edges and edge directions.
+
+    :param ele_iter: A CX element generator
+    :param multigraph: If True, reads into a MultiGraph keyed by edge id, keeping parallel edges
+    :param directed: If True, reads into a DiGraph or MultiDiGraph, keeping edge directions
+    :returns: A networkx Graph, MultiGraph, DiGraph or MultiDiGraph
+    """
+    if directed:
+        network = networkx.MultiDiGraph() if multigraph else networkx.DiGraph()
+    else:
+        network = networkx.MultiGraph() if multigraph else networkx.Graph()
+    edges = {}
+    edge_attrs = []
+    for ele in ele_iter:
+        if not 'label' in network.graph:
+            network.graph['label'] = ele.label
+        if ele.label != network.graph['label']:
+            break
+        ele_type = ele.WhichOneof('element')
+        if ele_type == 'node':
+            node = ele.node
+            network.add_node(int(node.id), name=node.name)
+        elif ele_type == 'edge':
+            edge = ele.edge
+            src, tgt = int(edge.sourceId), int(edge.targetId)
+            edges[int(edge.id)] = (src, tgt)
+            if multigraph:
+                network.add_edge(src, tgt, key=int(edge.id), id=int(edge.id), interaction=edge.interaction)
+            else:
+                network.add_edge(src, tgt, id=int(edge.id), interaction=edge.interaction)
+        elif ele_type == 'nodeAttribute':
+            attr = ele.nodeAttribute
+            network.add_node(attr.nodeId, **{attr.name: cxmate.Adapter.parse_value(attr)})
+        elif ele_type == 'edgeAttribute':
+            edge_attrs.append(ele.edgeAttribute)
+        elif ele_type == 'networkAttribute':
+            attr = ele.networkAttribute
+            network.graph[attr.name] = cxmate.Adapter.parse_value(attr)
+    for attr in edge_attrs:
+        edge_id = int(attr.edgeId)
+        source, target = edges[edge_id]
+        data = network[source][target][edge_id] if multigraph else network[source][target]
+        data[attr.name] = cxmate.Adapter.parse_value(attr)
+    return network
+
+def cx_elements(aspects, label='Input'):
+    """
+    Converts a CX document into the element stream cxmate would send for it
+
+    Only the aspects the service reads are converted, in document order, so a
+    network read from a CX file offline matches the one read from a request.
+
+    :param aspects: A parsed CX document, a list of single aspect dicts
+    :param label: The label of the elements
+    :returns: A CX element generator
+    """
+    builder = NetworkElementBuilder(label)
+    for aspect in aspects:
+        for name, elements in aspect.items():
+            for element in elements:
+                if name == 'nodes':
+                    yield builder.Node(element['@id'], element.get('n', ''))
+                elif name == 'edges':
+                    yield builder.Edge(element['@id'], element['s'], element['t'], element.get('i', ''))
+                elif name == 'nodeAttributes':
+                    yield builder.NodeAttribute(element['po'], element['n'], _parse_value(element))
+                elif name == 'edgeAttributes':
+                    yield builder.EdgeAttribute(element['po'], element['n'], _parse_value(element))
+                elif name == 'networkAttributes':
+                    yield builder.NetworkAttribute(element['n'], _parse_value(element))
+
+def _parse_value(element):
+    return VALUE_TYPES.get(element.get('d'), str)(element['v'])
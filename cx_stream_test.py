@@ -0,0 +1,60 @@
+import unittest
+
+from cxmate.service import NetworkElementBuilder
+
+import cx_stream
+
+def create_cx_stream():
+    builder = NetworkElementBuilder('Input')
+    yield builder.Node(1, 'A')
+    yield builder.Node(2, 'B')
+    yield builder.Node(3, 'C')
+    yield builder.NodeAttribute(1, 'diffusion_input', 1.0)
+    yield builder.EdgeAttribute(10, 'weight', 0.5)
+    yield builder.Edge(10, 1, 2, 'binds')
+    yield builder.Edge(11, 1, 2, 'activates')
+    yield builder.Edge(12, 2, 3, 'binds')
+    yield builder.EdgeAttribute(11, 'weight', 2.0)
+    yield builder.NetworkAttribute('name', 'test')
+
+class TestCXStream(unittest.TestCase):
+
+    def test_read_networkx(self):
+        network = cx_stream.read_networkx(create_cx_stream())
+        self.assertEqual(network.graph['label'], 'Input')
+        self.assertEqual(network.graph['name'], 'test')
+        self.assertEqual(network.node[1], {'name': 'A', 'diffusion_input': 1.0})
+        self.assertEqual(network.number_of_edges(), 2)
+        self.assertEqual(network[1][2]['weight'], 2.0)
+
+    def test_read_networkx_multigraph(self):
+        network = cx_stream.read_networkx(create_cx_stream(), multigraph=True)
+        self.assertEqual(network.number_of_edges(), 3)
+        self.assertEqual(network[1][2][10]['weight'], 0.5)
+        self.assertEqual(network[1][2][11]['weight'], 2.0)
+        self.assertEqual(network[1][2][11]['interaction'], 'activates')
+
+    def test_read_networkx_directed(self):
+        network = cx_stream.read_networkx(create_cx_stream(), directed=True)
+        self.assertTrue(network.is_directed())
+        self.assertTrue(network.has_edge(2, 3))
+        self.assertFalse(network.has_edge(3, 2))
+
+    def test_cx_elements(self):
+        aspects = [
+            {'numberVerification': [{'longNumber': 281474976710655}]},
+            {'nodes': [{'@id': 1, 'n': 'A'}, {'@id': 2, 'n': 'B'}]},
+            {'edges': [{'@id': 10, 's': 1, 't': 2, 'i': 'binds'}]},
+            {'nodeAttributes': [{'po': 1, 'n': 'diffusion_input', 'v': '1.5', 'd': 'double'}, {'po': 2, 'n': 'seed', 'v': 'false', 'd': 'boolean'}]},
+            {'edgeAttributes': [{'po': 10, 'n': 'weight', 'v': '3', 'd': 'integer'}]},
+            {'networkAttributes': [{'n': 'name', 'v': 'test'}]},
+        ]
+        network = cx_stream.read_networkx(cx_stream.cx_elements(aspects))
+        self.assertEqual(network.nodes(), [1, 2])
+        self.assertEqual(network.node[1]['diffusion_input'], 1.5)
+        self.assertEqual(network.node[2]['seed'], False)
+        self.assertEqual(network[1][2]['weight'], 3)
+        self.assertEqual(network.graph['name'], 'test')
+
+if __name__ == '__main__':
+    unittest.main()
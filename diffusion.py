@@ -0,0 +1,126 @@
+import numpy
+from numpy import argpartition, argsort, array, linspace
+
+import solvers
+from components import diffuse_components, find_components
+from laplacian import DTYPES, directed_laplacian_from_edges, laplacian_from_edges
+from reorder import reorder
+from rwr import DEFAULT_RESTART_PROBABILITY, random_walk_with_restart
+
+def build_laplacian(sources, targets, num_nodes, weights=None, normalize=False, reduce='sum', direction='undirected', dtype='float64'):
+    """
+    Builds the laplacian of a network from edge arrays
+
+    :param sources: An integer array with the source node index of every edge
+    :param targets: An integer array with the target node index of every edge
+    :param num_nodes: The number of nodes
+    :param weights: An array with the weight of every edge, None for unit weights
+    :param normalize: If True, builds the normalized laplacian of an undirected network
+    :param reduce: How the weights of parallel edges combine, one of sum, max or mean
+    :param direction: undirected, or out or in for the random walk laplacian of a directed network
+    :param dtype: The floating point type of the matrix, one of DTYPES
+    :returns: A csc matrix
+    """
+    if dtype not in DTYPES:
+        raise Exception('Unknown dtype ' + str(dtype) + ', expected one of ' + ', '.join(DTYPES))
+    if direction != 'undirected':
+        matrix = directed_laplacian_from_edges(sources, targets, num_nodes, weights, direction, reduce)
+    else:
+        matrix = laplacian_from_edges(sources, targets, num_nodes, weights, normalize, reduce)
+    if dtype != 'float64':
+        matrix = matrix.astype(dtype)
+    return matrix
+
+def time_points(time, start_time=0, num_times=1):
+    """
+    Returns the times heat is diffused to, num_times evenly spaced from start_time to time, or only time
+    """
+    if num_times > 1:
+        return linspace(start_time, time, num_times)
+    return array([time])
+
+def diffuse(laplacian, heat, time, start_time=0, num_times=1, solver='expm_multiply', tol=None, components=None, reordering=None, tunings=None, operator=None, executor=None):
+    """
+    Diffuses heat through a laplacian, optionally in its node Reordering and split into its Components
+
+    :param laplacian: A square sparse laplacian matrix, the reordered one when reordering is given, or a Spectrum
+    :param heat: A heat vector, or a matrix with one heat vector per column, in the original node order
+    :param time: The diffusion time, the last one when num_times is greater than 1
+    :param start_time: The first diffusion time when num_times is greater than 1
+    :param num_times: The number of evenly spaced diffusion times
+    :param solver: The name of a registered solver, or 'auto'
+    :param tol: The requested accuracy, None for the solver's default
+    :param components: The Components of laplacian, None to diffuse it as a whole
+    :param reordering: The Reordering laplacian is in, None for the original order
+    :param tunings: A function from a component label, -1 for the whole laplacian, to its ExpmTuning or None
+    :param operator: A function wrapping every matrix before the products, such as parallel_operator
+    :param executor: A concurrent.futures executor for the large components
+    :returns: The diffused heat, or an array with the diffused heat for each time along its first axis when num_times is greater than 1
+    """
+    times = time_points(time, start_time, num_times)
+    tunings = tunings or (lambda label: None)
+    operator = operator or (lambda matrix: matrix)
+    if reordering is not None:
+        heat = reordering.permute(heat)
+    if components is None:
+        diffused_heats = solvers.diffuse(operator(laplacian), heat, times, solver, tol, tunings(-1))
+    else:
+        block_diffuse = lambda block, block_heat, block_times, label: solvers.diffuse(operator(block), block_heat, block_times, solver, tol, tunings(label))
+        diffused_heats = diffuse_components(laplacian, components, heat, times, block_diffuse, executor)
+    if reordering is not None:
+        diffused_heats = reordering.restore(diffused_heats)
+    if num_times > 1:
+        return diffused_heats
+    return diffused_heats[-1]
+
+def diffuse_edges(sources, targets, num_nodes, heat, time, weights=None, normalize=False, reduce='sum', direction='undirected', start_time=0, num_times=1, solver='expm_multiply', tol=None, kernel='heat', restart_probability=DEFAULT_RESTART_PROBABILITY, node_order='none', dtype='float64', executor=None):
+    """
+    Diffuses heat through a network given as edge arrays, without building a graph object
+
+    This is the whole numeric pipeline of the service in one call, for batch jobs
+    and notebooks that hold their networks as arrays.
+
+    :param sources: An integer array with the source node index of every edge
+    :param targets: An integer array with the target node index of every edge
+    :param num_nodes: The number of nodes
+    :param heat: A heat vector, or a matrix with one heat vector per column
+    :param time: The diffusion time, the last one when num_times is greater than 1
+    :param weights: An array with the weight of every edge, None for unit weights
+    :param normalize: If True, diffuses through the normalized laplacian
+    :param reduce: How the weights of parallel edges combine, one of sum, max or mean
+    :param direction: undirected, or out or in to diffuse along or against the edges
+    :param start_time: The first diffusion time when num_times is greater than 1
+    :param num_times: The number of evenly spaced diffusion times
+    :param solver: The name of a registered solver, or 'auto'
+    :param tol: The requested accuracy, None for the solver's default
+    :param kernel: heat for the heat kernel, rwr for the random walk with restart kernel
+    :param restart_probability: The restart probability of the rwr kernel
+    :param node_order: The node order of the sparse products, one of none, rcm or degree
+    :param dtype: The floating point type of the laplacian and heats
+    :param executor: A concurrent.futures executor for the large components
+    :returns: The diffused heat, or an array with the diffused heat for each time along its first axis when num_times is greater than 1
+    """
+    if kernel == 'rwr':
+        laplacian = build_laplacian(sources, targets, num_nodes, weights, False, reduce)
+        return random_walk_with_restart(laplacian, heat, restart_probability, tol)[0]
+    if kernel != 'heat':
+        raise Exception('Unknown kernel ' + str(kernel) + ', expected heat or rwr')
+    laplacian = build_laplacian(sources, targets, num_nodes, weights, normalize, reduce, direction, dtype)
+    heat = numpy.asarray(heat).astype(dtype)
+    reordering = reorder(laplacian, node_order) if node_order != 'none' else None
+    ordered = reordering.laplacian if reordering is not None else laplacian
+    return diffuse(ordered, heat, time, start_time, num_times, solver, tol, find_components(ordered), reordering, executor=executor)
+
+def rank_heat(heat, top_k=0):
+    """
+    Returns the indices of the hottest nodes, hottest first and ties in node order
+
+    :param heat: A heat vector
+    :param top_k: If greater than 0, only the top_k hottest nodes are returned
+    :returns: An integer array of node indices
+    """
+    if 0 < top_k < len(heat):
+        hottest = argpartition(-heat, top_k - 1)[:top_k]
+        hottest.sort()
+        return hottest[argsort(-heat[hottest], kind='mergesort')]
+    return argsort(-heat, kind='mergesort')
@@ -0,0 +1,47 @@
+import unittest
+
+import networkx
+import numpy
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import expm_multiply
+
+from diffusion import build_laplacian, diffuse_edges, rank_heat
+from rwr import random_walk_with_restart
+
+class TestDiffusion(unittest.TestCase):
+
+    def setUp(self):
+        self.network = networkx.disjoint_union(networkx.gnm_random_graph(60, 150, seed=3), networkx.cycle_graph(8))
+        edges = numpy.array(self.network.edges())
+        self.sources, self.targets = edges[:, 0], edges[:, 1]
+        self.heat = numpy.zeros((68, 2))
+        self.heat[[0, 5, 62], 0] = 1.0
+        self.heat[[7, 30], 1] = [2.0, 0.5]
+
+    def test_build_laplacian(self):
+        for normalize, expected in ((False, networkx.laplacian_matrix), (True, networkx.normalized_laplacian_matrix)):
+            laplacian = build_laplacian(self.sources, self.targets, 68, normalize=normalize)
+            self.assertAlmostEqual(abs(laplacian - expected(self.network, nodelist=range(68))).max(), 0)
+        self.assertEqual(build_laplacian(self.sources, self.targets, 68, dtype='float32').dtype, numpy.float32)
+        self.assertRaises(Exception, build_laplacian, self.sources, self.targets, 68, dtype='float16')
+
+    def test_diffuse_edges(self):
+        laplacian = csc_matrix(networkx.laplacian_matrix(self.network, nodelist=range(68)), dtype=float)
+        expected = expm_multiply(-0.5 * laplacian, self.heat)
+        for node_order in ('none', 'rcm'):
+            diffused = diffuse_edges(self.sources, self.targets, 68, self.heat, 0.5, node_order=node_order)
+            self.assertTrue(numpy.allclose(diffused, expected))
+        diffused = diffuse_edges(self.sources, self.targets, 68, self.heat[:, 0], 0.5, start_time=0.1, num_times=3)
+        self.assertEqual(diffused.shape, (3, 68))
+        self.assertTrue(numpy.allclose(diffused[-1], expected[:, 0]))
+        diffused = diffuse_edges(self.sources, self.targets, 68, self.heat, 0.5, kernel='rwr', restart_probability=0.3)
+        self.assertTrue(numpy.allclose(diffused, random_walk_with_restart(laplacian, self.heat, 0.3)[0]))
+        self.assertRaises(Exception, diffuse_edges, self.sources, self.targets, 68, self.heat, 0.5, kernel='unknown')
+
+    def test_rank_heat(self):
+        heat = numpy.array([0.5, 2.0, 0.5, 1.0])
+        self.assertEqual(list(rank_heat(heat)), [1, 3, 0, 2])
+        self.assertEqual(list(rank_heat(heat, 3)), [1, 3, 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+from __future__ import division
+
+import threading
+
+import numpy
+from scipy.sparse import identity
+from scipy.sparse.linalg._expm_multiply import LazyOperatorNormInfo, _fragment_3_1
+
+UNIT_ROUNDOFF = 2 ** -53
+
+def unit_roundoff(dtype):
+    """
+    Returns the unit roundoff of a floating point type, 2^-53 for float64 and 2^-24 for float32
+    """
+    return float(numpy.finfo(dtype).eps) / 2
+
+class ExpmTuning(object):
+    """
+    The parameters scipy's expm_multiply derives for one laplacian, memoized
+
+    expm_multiply shifts the laplacian by the mean of its diagonal, estimates
+    norms of powers of the shifted matrix with onenormest, and picks a Taylor
+    degree m and a number of scaling steps s from them on every call. These depend
+    only on the laplacian, the time and the number of heat vectors, so they are
+    computed once here and later calls go straight to the products.
+    """
+
+    def __init__(self):
+        self.shift = None
+        self.norm = None
+        self.steps = {}
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return 64 * (len(self.steps) + 1)
+
+    def parameters(self, laplacian, time, columns=1, tol=UNIT_ROUNDOFF):
+        """
+        Returns the shift, Taylor degree and number of scaling steps for exp(-time * laplacian)
+
+        :param laplacian: The square sparse laplacian matrix these parameters are for
+        :param time: The diffusion time
+        :param columns: The number of heat vectors diffused together
+        :param tol: The accuracy of the Taylor series
+        :returns: A tuple of the shift, the degree m and the number of steps s
+        """
+        key = (float('%.12g' % time), columns, tol)
+        with self.lock:
+            if key in self.steps:
+                return (self.shift,) + self.steps[key]
+        n = laplacian.shape[0]
+        shifted = None
+        if self.shift is None:
+            shift = float(laplacian.diagonal().sum()) / n if n else 0.0
+            shifted = self._shifted(laplacian, shift)
+            self.norm = float(abs(shifted).sum(axis=0).max()) if n else 0.0
+            self.shift = shift
+        if time * self.norm == 0:
+            degree, steps = 0, 1
+        else:
+            shifted = self._shifted(laplacian, self.shift) if shifted is None else shifted
+            norm_info = LazyOperatorNormInfo(time * shifted, A_1_norm=time * self.norm, ell=2)
+            degree, steps = _fragment_3_1(norm_info, columns, tol, ell=2)
+        with self.lock:
+            self.steps[key] = (degree, steps)
+        return self.shift, degree, steps
+
+    def _shifted(self, laplacian, shift):
+        return shift * identity(laplacian.shape[0], format='csc') - laplacian
+
+def taylor(laplacian, heat, time, shift, degree, steps, tol=UNIT_ROUNDOFF):
+    """
+    Computes exp(-time * laplacian) * heat by the truncated Taylor series of
+    Al-Mohy and Higham, given the parameters of an ExpmTuning
+
+    This is the inner loop of scipy's expm_multiply, applying the shifted
+    laplacian through products with laplacian itself.
+
+    :param laplacian: A square sparse laplacian matrix, or any operator with a dot method
+    :param heat: A heat vector, or a matrix with one heat vector per column
+    :param time: The diffusion time
+    :param shift: The mean of the diagonal of laplacian
+    :param degree: The degree of the Taylor series
+    :param steps: The number of scaling steps
+    :param tol: The accuracy of the Taylor series
+    :returns: The diffused heat, shaped like heat
+    """
+    time = float(time)
+    result = term = numpy.asarray(heat)
+    factor = float(numpy.exp(-time * shift / steps))
+    for _ in range(steps):
+        previous = _inf_norm(term)
+        for j in range(degree):
+            term = (time / (steps * (j + 1))) * (shift * term - laplacian.dot(term))
+            current = _inf_norm(term)
+            result = result + term
+            if previous + current <= tol * _inf_norm(result):
+                break
+            previous = current
+        result = factor * result
+        term = result
+    return result
+
+def _inf_norm(x):
+    return numpy.abs(x).max() if x.ndim == 1 else numpy.abs(x).sum(axis=1).max()
@@ -0,0 +1,52 @@
+import unittest
+
+import networkx
+import numpy
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import expm_multiply
+
+import solvers
+from expm import ExpmTuning, taylor
+from laplacian import directed_laplacian_from_edges
+
+class TestExpm(unittest.TestCase):
+
+    def setUp(self):
+        network = networkx.gnm_random_graph(200, 800, seed=5)
+        self.laplacian = csc_matrix(networkx.laplacian_matrix(network), dtype=float)
+        edges = numpy.array(network.edges())
+        self.directed = directed_laplacian_from_edges(edges[:, 0], edges[:, 1], 200)
+        self.heat = numpy.zeros((200, 3))
+        self.heat[:4, 0] = 1.0
+        self.heat[50, 1] = 2.0
+        self.heat[:, 2] = numpy.random.RandomState(0).rand(200)
+
+    def test_taylor(self):
+        for laplacian in (self.laplacian, self.directed):
+            tuning = ExpmTuning()
+            for time in (0.0, 0.1, 2.0):
+                for heat in (self.heat, self.heat[:, 0]):
+                    columns = 1 if heat.ndim == 1 else heat.shape[1]
+                    actual = taylor(laplacian, heat, time, *tuning.parameters(laplacian, time, columns))
+                    self.assertTrue(numpy.allclose(actual, expm_multiply(-time * laplacian, heat), atol=1e-12))
+
+    def test_parameters_memoized(self):
+        tuning = ExpmTuning()
+        first = tuning.parameters(self.laplacian, 0.5, 3)
+        self.assertEqual(tuning.parameters(self.laplacian, 0.5 + 1e-15, 3), first)
+        self.assertEqual(len(tuning.steps), 1)
+        tuning.parameters(self.laplacian, 1.0, 3)
+        self.assertEqual(len(tuning.steps), 2)
+        self.assertAlmostEqual(tuning.shift, self.laplacian.diagonal().mean())
+
+    def test_solvers_tuning(self):
+        times = numpy.linspace(0, 1, 5)
+        tuning = ExpmTuning()
+        expected = solvers.diffuse(self.laplacian, self.heat, times)
+        for _ in range(2):
+            actual = solvers.diffuse(self.laplacian, self.heat, times, tuning=tuning)
+            self.assertTrue(numpy.allclose(actual, expected, atol=1e-12))
+        self.assertEqual(len(tuning.steps), 2)
+
+if __name__ == '__main__':
+    unittest.main()
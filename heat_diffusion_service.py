@@ -1,40 +1,237 @@
 import operator
+import os
+from concurrent import futures
 
 import networkx
-from numpy import array
-from scipy.sparse import csc_matrix
-from scipy.sparse.linalg import expm, expm_multiply
+from numpy import arange, array, array_equal, asarray, float64, fromiter, int64, zeros
 
 import cxmate
 
+import cx_stream
+import diffusion
+from cache import LRUCache, DEFAULT_MAX_BYTES, topology_fingerprint
+from components import DEFAULT_WORKERS, find_components
+from expm import ExpmTuning
+from heat_kernel import HeatKernelCache, KernelStore, diffuse_rows
+from incremental import DEFAULT_TOL, MAX_EDIT_NODES, IncrementalDiffusion
+from laplacian import DTYPES
+from local import DEFAULT_EPSILON, local_diffuse
+from parallel import parallel_operator
+from permutation import permutation_test
+from reorder import reorder
+from rwr import DEFAULT_RESTART_PROBABILITY, random_walk_with_restart
+from spectral import SpectrumStore
+
 class HeatDiffusionService(cxmate.Service):
 
+    def __init__(self, laplacian_cache_bytes=DEFAULT_MAX_BYTES, spectrum_dir=None, component_workers=DEFAULT_WORKERS, matvec_workers=DEFAULT_WORKERS, kernel_dir=None):
+        self.laplacian_cache = LRUCache(laplacian_cache_bytes)
+        self.components = LRUCache(laplacian_cache_bytes)
+        self.reorderings = LRUCache(laplacian_cache_bytes)
+        self.expm_tunings = LRUCache(laplacian_cache_bytes)
+        self.executor = futures.ThreadPoolExecutor(component_workers) if component_workers > 1 else None
+        self.matvec_workers = matvec_workers
+        self.matvec_executor = futures.ThreadPoolExecutor(matvec_workers) if matvec_workers > 1 else None
+        self.spectra = SpectrumStore(spectrum_dir, LRUCache(laplacian_cache_bytes))
+        self.kernels = HeatKernelCache(laplacian_cache_bytes)
+        self.kernel_store = KernelStore(kernel_dir)
+        self.rwr_solutions = LRUCache(laplacian_cache_bytes)
+        self.incremental = LRUCache(laplacian_cache_bytes)
+
     def process(self, params, input_stream):
-        network = cxmate.Adapter.to_networkx(input_stream)[0]
+        edge_weight_key = params.get('edge_weight_attribute_name') or None
+        edge_weight_reduce = params.get('edge_weight_reduce') or 'sum'
+        direction = params.get('direction') or 'undirected'
+        node_order = params.get('node_order') or 'none'
+        dtype = params.get('dtype') or 'float64'
+        network_id = params.get('network_id') or None
+        max_edit_nodes = int(params.get('max_edit_nodes', MAX_EDIT_NODES))
+        network = cx_stream.read_networkx(input_stream, multigraph=edge_weight_key is not None, directed=direction != 'undirected')
         time = params['time']
         input_key = params['input_attribute_name']
+        input_prefix = params.get('input_attribute_prefix')
+        if input_prefix:
+            input_key = self.find_heat_keys(network, input_prefix)
+        elif ',' in input_key:
+            input_key = [key.strip() for key in input_key.split(',') if key.strip()]
         output_key = params['output_attribute_name']
         normalize_laplacian = params['normalize_laplacian']
-        network = self.diffusion(network, input_key, output_key, normalize_laplacian, time)
+        start_time = params.get('start_time', 0)
+        num_times = int(params.get('num_times', 1))
+        solver = params.get('solver') or 'expm_multiply'
+        tol = params.get('tol') or None
+        if solver == 'local':
+            tol = params.get('epsilon') or DEFAULT_EPSILON
+        spectrum_rank = int(params.get('spectrum_rank', 0))
+        use_kernel_cache = params.get('use_kernel_cache', False)
+        top_k = int(params.get('top_k', 0))
+        output_mode = params.get('output_mode') or 'network'
+        heat_threshold = params.get('heat_threshold')
+        largest_component = params.get('largest_component', False)
+        include_edges = params.get('include_edges', True)
+        kernel = params.get('kernel') or 'heat'
+        restart_probability = params.get('restart_probability', DEFAULT_RESTART_PROBABILITY)
+        num_permutations = int(params.get('num_permutations', 0))
+        permutation_seed = int(params.get('permutation_seed', 0))
+        network = self.diffusion(network, input_key, output_key, normalize_laplacian, time, start_time, num_times, solver, tol, spectrum_rank, use_kernel_cache, top_k, output_mode, heat_threshold, largest_component, include_edges, kernel, restart_probability, num_permutations, permutation_seed, edge_weight_key, edge_weight_reduce, direction, node_order, dtype, network_id, max_edit_nodes)
         network.graph['label'] = 'Output'
         return cxmate.Adapter.from_networkx([network])
 
-    def diffusion(self, network, input_key, output_key, normalize_laplacian, time):
-        matrix = self.create_sparse_matrix(network, normalize_laplacian)
-        heat_array = self.find_heat(network, input_key)
-        diffused_heat_array = self.diffuse(matrix, heat_array, time)
-        network = self.add_heat(network, output_key, diffused_heat_array)
+    def diffusion(self, network, input_key, output_key, normalize_laplacian, time, start_time=0, num_times=1, solver='expm_multiply', tol=None, spectrum_rank=0, use_kernel_cache=False, top_k=0, output_mode='network', heat_threshold=None, largest_component=False, include_edges=True, kernel='heat', restart_probability=DEFAULT_RESTART_PROBABILITY, num_permutations=0, permutation_seed=0, edge_weight_key=None, edge_weight_reduce='sum', direction='undirected', node_order='none', dtype='float64', network_id=None, max_edit_nodes=MAX_EDIT_NODES):
+        if dtype not in DTYPES:
+            raise Exception('Unknown dtype ' + str(dtype) + ', expected one of ' + ', '.join(DTYPES))
+        if solver == 'spectral':
+            dtype = 'float64'
+        if direction != 'undirected':
+            if not network.is_directed():
+                raise Exception('Directed diffusion needs a directed network')
+            if kernel != 'heat' or solver in ('lanczos', 'chebyshev', 'spectral'):
+                raise Exception('Directed diffusion needs the heat kernel and one of the expm_multiply, eigen, local or auto solvers')
+        topology = self.topology_key(network, normalize_laplacian, edge_weight_key, edge_weight_reduce, direction, dtype)
+        laplacian = lambda: self.find_operator(network, normalize_laplacian, solver, spectrum_rank, topology, edge_weight_key, edge_weight_reduce, direction, dtype)
+        reordering = lambda: self.find_reordering(topology, laplacian, node_order) if node_order != 'none' and solver not in ('spectral', 'local') else None
+        ordered = lambda: reordering().laplacian if reordering() is not None else laplacian()
+        components = lambda: self.find_components(topology + (node_order,), ordered) if solver not in ('spectral', 'local') else None
+        if isinstance(input_key, (list, tuple)):
+            heat_array = self.find_heats(network, input_key)
+            output_keys = [self.input_output_key(output_key, heat_key) for heat_key in input_key] if len(input_key) > 1 else [output_key]
+        else:
+            heat_array = self.find_heat(network, input_key)
+            output_keys = [output_key]
+        heat_array = heat_array.astype(dtype)
+        dense_kernel = None
+        if kernel == 'heat' and num_times == 1 and solver != 'local':
+            dense_kernel = self.find_dense_kernel(network, topology, time, normalize_laplacian, edge_weight_key, edge_weight_reduce, direction, dtype)
+        if kernel == 'rwr':
+            diffuse_heats = lambda heats: self.random_walk(network, heats, restart_probability, tol, edge_weight_key, edge_weight_reduce, network_id)
+        elif dense_kernel is not None:
+            diffuse_heats = lambda heats: diffuse_rows(dense_kernel, heats)
+        else:
+            diffuse_heats = lambda heats: self.diffuse(ordered(), heats, time, solver=solver, tol=tol, components=components(), reordering=reordering(), key=topology + (node_order,))
+        if num_permutations > 0 and (num_times > 1 or solver == 'local'):
+            raise Exception('Permutation tests need a single time and a solver other than local')
+        if kernel == 'rwr':
+            diffused_heat_array = diffuse_heats(heat_array)
+            network = self.add_heats(network, output_keys, diffused_heat_array, top_k)
+        elif kernel != 'heat':
+            raise Exception('Unknown kernel ' + str(kernel) + ', expected heat or rwr')
+        elif num_times > 1:
+            diffused_heat_arrays = self.diffuse(ordered(), heat_array, time, start_time, num_times, solver, tol, components(), reordering(), topology + (node_order,))
+            time_output_keys = []
+            for t, diffused_heat_array in zip(self.time_points(time, start_time, num_times), diffused_heat_arrays):
+                time_output_keys.append([self.time_output_key(heat_key, t) for heat_key in output_keys])
+                network = self.add_heats(network, time_output_keys[-1], diffused_heat_array, top_k)
+            output_keys = [heat_key for heat_keys in time_output_keys for heat_key in heat_keys]
+        elif solver == 'local' and heat_array.ndim == 1:
+            indices, diffused_heat_array, _ = local_diffuse(laplacian(), heat_array, time, tol or DEFAULT_EPSILON)
+            network = self.add_sparse_heat(network, output_key, indices, diffused_heat_array, top_k)
+        elif network_id is not None and dense_kernel is None and heat_array.ndim == 1 and solver != 'spectral' and dtype == 'float64':
+            key = (network_id, bool(normalize_laplacian), edge_weight_key, edge_weight_reduce, direction)
+            diffused_heat_array = self.incremental_diffuse(key, network.nodes(), laplacian, heat_array, time, tol, max_edit_nodes)
+            network = self.add_heats(network, output_keys, diffused_heat_array, top_k)
+        else:
+            if use_kernel_cache and dense_kernel is None and self.kernels.accepts(heat_array):
+                diffused_heat_array = self.kernels.diffuse(topology, laplacian, heat_array, time, solver, tol)
+            else:
+                diffused_heat_array = diffuse_heats(heat_array)
+            network = self.add_heats(network, output_keys, diffused_heat_array, top_k)
+        if num_permutations > 0:
+            network = self.add_significance(network, output_keys, heat_array, diffused_heat_array, diffuse_heats, num_permutations, permutation_seed)
+        if output_mode == 'subnetwork':
+            network = self.extract_subnetwork(network, output_keys, heat_threshold, largest_component, include_edges)
+        elif output_mode != 'network':
+            raise Exception('Unknown output mode ' + str(output_mode) + ', expected network or subnetwork')
         return network
 
-    def diffuse(self, matrix, heat_array, time):
-        return expm_multiply(-matrix, heat_array, start=0, stop=time, endpoint=True)[-1]
+    def diffuse(self, matrix, heat_array, time, start_time=0, num_times=1, solver='expm_multiply', tol=None, components=None, reordering=None, key=None):
+        tunings = lambda label: self.find_tuning(key, label)
+        return diffusion.diffuse(matrix, heat_array, time, start_time, num_times, solver, tol, components, reordering, tunings, self.parallel_operator, self.executor)
+
+    def parallel_operator(self, matrix):
+        return parallel_operator(matrix, self.matvec_executor, self.matvec_workers)
+
+    def incremental_diffuse(self, key, nodes, laplacian, heat_array, time, tol=None, max_edit_nodes=MAX_EDIT_NODES):
+        tol = tol or DEFAULT_TOL
+        state = self.incremental.get(key)
+        if state is not None:
+            with state.lock:
+                if state.nodes == nodes and state.time == time and state.tol == tol and array_equal(state.heat, heat_array) and state.update(laplacian(), max_edit_nodes):
+                    return state.result
+        state = IncrementalDiffusion(laplacian(), heat_array, time, tol, nodes)
+        self.incremental.put(key, state)
+        return state.result
+
+    def random_walk(self, network, heat_array, restart_probability=DEFAULT_RESTART_PROBABILITY, tol=None, weight_key=None, reduce='sum', network_id=None):
+        topology = self.topology_key(network, False, weight_key, reduce)
+        matrix = self.create_sparse_matrix(network, False, topology, weight_key, reduce)
+        key = (network_id or topology, restart_probability, heat_array.shape)
+        diffused_heat_array, _ = random_walk_with_restart(matrix, heat_array, restart_probability, tol, self.rwr_solutions.get(key))
+        self.rwr_solutions.put(key, diffused_heat_array)
+        return diffused_heat_array
 
+    def time_points(self, time, start_time=0, num_times=1):
+        return diffusion.time_points(time, start_time, num_times)
 
-    def create_sparse_matrix(self, network, normalize=False):
-        if normalize:
-            return csc_matrix(networkx.normalized_laplacian_matrix(network))
+    def time_output_key(self, output_key, time):
+        return '%s_t%g' % (output_key, time)
+
+    def input_output_key(self, output_key, input_key):
+        return '%s_%s' % (output_key, input_key)
+
+    def topology_key(self, network, normalize=False, weight_key=None, reduce='sum', direction='undirected', dtype='float64'):
+        if weight_key is None:
+            fingerprint = topology_fingerprint(network)
         else:
-            return csc_matrix(networkx.laplacian_matrix(network))
+            fingerprint = topology_fingerprint(network, weight_key) + '-' + reduce
+        if direction != 'undirected':
+            fingerprint += '-' + direction
+        if dtype != 'float64':
+            fingerprint += '-' + dtype
+        return (fingerprint, bool(normalize))
+
+    def create_sparse_matrix(self, network, normalize=False, key=None, weight_key=None, reduce='sum', direction='undirected', dtype='float64'):
+        key = key or self.topology_key(network, normalize, weight_key, reduce, direction, dtype)
+        return self.laplacian_cache.get_or_create(key, lambda: self.build_sparse_matrix(network, normalize, weight_key, reduce, direction, dtype))
+
+    def find_components(self, key, laplacian):
+        return self.components.get_or_create(key, lambda: find_components(laplacian()))
+
+    def find_dense_kernel(self, network, key, time, normalize=False, weight_key=None, reduce='sum', direction='undirected', dtype='float64'):
+        if self.kernel_store.directory is None:
+            return None
+        if dtype != 'float64':
+            key = self.topology_key(network, normalize, weight_key, reduce, direction)
+        return self.kernel_store.get('%s-%d' % key, time)
+
+    def find_tuning(self, key, label):
+        if key is None or label is None:
+            return None
+        return self.expm_tunings.get_or_create(key + (label,), ExpmTuning)
+
+    def find_reordering(self, key, laplacian, ordering):
+        return self.reorderings.get_or_create(key + (ordering,), lambda: reorder(laplacian(), ordering))
+
+    def find_operator(self, network, normalize=False, solver='expm_multiply', spectrum_rank=0, key=None, weight_key=None, reduce='sum', direction='undirected', dtype='float64'):
+        if solver == 'spectral':
+            return self.find_spectrum(network, normalize, spectrum_rank, key, weight_key, reduce)
+        return self.create_sparse_matrix(network, normalize, key, weight_key, reduce, direction, dtype)
+
+    def find_spectrum(self, network, normalize=False, rank=0, key=None, weight_key=None, reduce='sum'):
+        key = key or self.topology_key(network, normalize, weight_key, reduce)
+        name = '%s-%d' % key
+        return self.spectra.get(name, lambda: self.create_sparse_matrix(network, normalize, key, weight_key, reduce), rank)
+
+    def build_sparse_matrix(self, network, normalize=False, weight_key=None, reduce='sum', direction='undirected', dtype='float64'):
+        sources, targets, weights = self.edge_arrays(network, weight_key)
+        return diffusion.build_laplacian(sources, targets, network.number_of_nodes(), weights, normalize, reduce, direction, dtype)
+
+    def edge_arrays(self, network, weight_key):
+        index = {node_id: i for i, node_id in enumerate(network.nodes())}
+        edges = network.edges(data=weight_key, default=1.0)
+        sources = fromiter((index[source] for source, _, _ in edges), dtype=int64, count=len(edges))
+        targets = fromiter((index[target] for _, target, _ in edges), dtype=int64, count=len(edges))
+        weights = fromiter((weight for _, _, weight in edges), dtype=float64, count=len(edges))
+        return sources, targets, weights
 
     def find_heat(self, network, heat_key):
         heat_list = []
@@ -47,14 +244,84 @@ class HeatDiffusionService(cxmate.Service):
             raise Exception('No input heat found')
         return array(heat_list)
 
-    def add_heat(self, network, output_key, heat_array):
-        node_heat = {node_id: heat_array[i] for i, node_id in enumerate(network.nodes())}
-        sorted_nodes = sorted(node_heat.items(), key=lambda x:x[1], reverse=True)
-        node_rank = {node_id: i for i, (node_id, _) in enumerate(sorted_nodes)}
+    def find_heats(self, network, heat_keys):
+        columns = {key: i for i, key in enumerate(heat_keys)}
+        heat_matrix = zeros((network.number_of_nodes(), len(heat_keys)))
+        found_heat = zeros(len(heat_keys), dtype=bool)
+        for row, node_id in enumerate(network.nodes()):
+            for key, value in network.node[node_id].items():
+                if key in columns:
+                    heat_matrix[row, columns[key]] = value
+                    found_heat[columns[key]] = True
+        if not found_heat.all():
+            missing = [key for key, found in zip(heat_keys, found_heat) if not found]
+            raise Exception('No input heat found for ' + ', '.join(missing))
+        return heat_matrix
+
+    def find_heat_keys(self, network, prefix):
+        heat_keys = set()
+        for node_id in network.nodes():
+            heat_keys.update(key for key in network.node[node_id] if key.startswith(prefix))
+        if not heat_keys:
+            raise Exception('No input heat found')
+        return sorted(heat_keys)
+
+    def add_heat(self, network, output_key, heat_array, top_k=0):
+        return self.add_sparse_heat(network, output_key, arange(network.number_of_nodes()), heat_array, top_k)
+
+    def add_sparse_heat(self, network, output_key, indices, heat_array, top_k=0):
+        nodes = network.nodes()
+        heat_array = asarray(heat_array, dtype=float64)
+        ranked = self.rank_heat(heat_array, top_k)
+        node_heat = {nodes[indices[i]]: heat_array[i] for i in ranked}
+        node_rank = {nodes[indices[i]]: rank for rank, i in enumerate(ranked)}
         networkx.set_node_attributes(network, output_key+'_heat', node_heat)
         networkx.set_node_attributes(network, output_key+'_rank', node_rank)
         return network
 
+    def rank_heat(self, heat_array, top_k=0):
+        return diffusion.rank_heat(heat_array, top_k)
+
+    def add_heats(self, network, output_keys, heat_matrix, top_k=0):
+        heat_matrix = heat_matrix.reshape(network.number_of_nodes(), -1)
+        for column, output_key in enumerate(output_keys):
+            network = self.add_heat(network, output_key, heat_matrix[:, column], top_k)
+        return network
+
+    def add_significance(self, network, output_keys, heat_matrix, diffused_heat_matrix, diffuse_heats, num_permutations, seed=0):
+        nodes = network.nodes()
+        degree = network.degree()
+        degrees = array([degree[node_id] for node_id in nodes])
+        heat_matrix = heat_matrix.reshape(len(nodes), -1)
+        diffused_heat_matrix = diffused_heat_matrix.reshape(len(nodes), -1)
+        for column, output_key in enumerate(output_keys):
+            p_values, z_scores = permutation_test(diffuse_heats, heat_matrix[:, column], diffused_heat_matrix[:, column], degrees, num_permutations, seed)
+            heated = [i for i, node_id in enumerate(nodes) if output_key+'_heat' in network.node[node_id]]
+            networkx.set_node_attributes(network, output_key+'_p_value', {nodes[i]: p_values[i] for i in heated})
+            networkx.set_node_attributes(network, output_key+'_z_score', {nodes[i]: z_scores[i] for i in heated})
+        return network
+
+    def extract_subnetwork(self, network, output_keys, heat_threshold=None, largest_component=False, include_edges=True):
+        heat_keys = [output_key+'_heat' for output_key in output_keys]
+        hot_nodes = []
+        for node_id, data in network.nodes_iter(data=True):
+            heats = [data[heat_key] for heat_key in heat_keys if heat_key in data]
+            if heats and (heat_threshold is None or max(heats) >= heat_threshold):
+                hot_nodes.append(node_id)
+        subnetwork = network.subgraph(hot_nodes)
+        if largest_component and hot_nodes:
+            components = networkx.weakly_connected_components if subnetwork.is_directed() else networkx.connected_components
+            subnetwork = subnetwork.subgraph(max(components(subnetwork), key=len))
+        if not include_edges:
+            subnetwork.remove_edges_from(subnetwork.edges())
+        return subnetwork
+
 if __name__ == '__main__':
-    myService = HeatDiffusionService()
+    myService = HeatDiffusionService(
+        int(os.environ.get('HEAT_DIFFUSION_CACHE_BYTES', DEFAULT_MAX_BYTES)),
+        os.environ.get('HEAT_DIFFUSION_SPECTRUM_DIR'),
+        int(os.environ.get('HEAT_DIFFUSION_COMPONENT_WORKERS', DEFAULT_WORKERS)),
+        int(os.environ.get('HEAT_DIFFUSION_MATVEC_WORKERS', DEFAULT_WORKERS)),
+        os.environ.get('HEAT_DIFFUSION_KERNEL_DIR'),
+    )
     myService.run('0.0.0.0:8080')
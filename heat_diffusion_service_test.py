@@ -1,5 +1,7 @@
 import unittest
 import random
+import shutil
+import tempfile
 
 import networkx
 
@@ -30,11 +32,242 @@ class TestHeatDiffusionService(unittest.TestCase):
             self.assertIn('diffusion_output_heat', node)
             self.assertEqual(s1[index], s2[index])
 
+    def test_add_heat_top_k(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(num_nodes=50)
+        new_heats = [random.uniform(1,100) for node in network.nodes()]
+        network = hds.add_heat(network, 'diffusion_output', new_heats, top_k=10)
+        ranked = [data for node, data in network.nodes(data=True) if 'diffusion_output_rank' in data]
+        self.assertEqual(len(ranked), 10)
+        self.assertEqual(sorted(data['diffusion_output_rank'] for data in ranked), list(range(10)))
+        hottest = sorted(new_heats, reverse=True)[:10]
+        for data in ranked:
+            self.assertEqual(data['diffusion_output_heat'], hottest[data['diffusion_output_rank']])
+
     def test_diffusion(self):
         hds = HeatDiffusionService()
         network = create_random_networkx_mock(heats=50)
         network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 1.0)
 
+    def test_diffusion_time_grid(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=50)
+        single = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 1.0)
+        network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 1.0, 0.5, 3)
+        for node_id, data in network.nodes(data=True):
+            for t in ('0.5', '0.75', '1'):
+                self.assertIn('diffusion_output_t' + t + '_heat', data)
+                self.assertIn('diffusion_output_t' + t + '_rank', data)
+            self.assertAlmostEqual(data['diffusion_output_t1_heat'], single.node[node_id]['diffusion_output_heat'])
+
+    def test_find_heats(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=50)
+        for node_id in range(0, 10):
+            network.node[node_id]['other_input'] = 2.0
+        self.assertEqual(hds.find_heat_keys(network, 'other'), ['other_input'])
+        heats = hds.find_heats(network, ['diffusion_input', 'other_input'])
+        self.assertEqual(heats.shape, (100, 2))
+        self.assertEqual(heats[:, 0].sum(), 50.0)
+        self.assertEqual(heats[:, 1].sum(), 20.0)
+        self.assertRaises(Exception, hds.find_heats, network, ['diffusion_input', 'missing_input'])
+
+    def test_diffusion_multiple_inputs(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=50)
+        for node_id in range(0, 10):
+            network.node[node_id]['other_input'] = 1.0
+        single = hds.diffusion(network.copy(), 'other_input', 'diffusion_output', False, 1.0)
+        network = hds.diffusion(network, ['diffusion_input', 'other_input'], 'diffusion_output', False, 1.0)
+        for node_id, data in network.nodes(data=True):
+            self.assertIn('diffusion_output_diffusion_input_heat', data)
+            self.assertAlmostEqual(data['diffusion_output_other_input_heat'], single.node[node_id]['diffusion_output_heat'])
+
+    def test_diffusion_spectral(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=50)
+        expected = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 1.0)
+        network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 1.0, solver='spectral')
+        network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 1.0, solver='spectral')
+        self.assertEqual(hds.spectra.cache.hits, 1)
+        for node_id, data in network.nodes(data=True):
+            self.assertAlmostEqual(data['diffusion_output_heat'], expected.node[node_id]['diffusion_output_heat'])
+
+    def test_diffusion_kernel_cache(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=5)
+        expected = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 1.0)
+        network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 1.0, use_kernel_cache=True)
+        self.assertEqual(len(hds.kernels.columns), 5)
+        for node_id, data in network.nodes(data=True):
+            self.assertAlmostEqual(data['diffusion_output_heat'], expected.node[node_id]['diffusion_output_heat'])
+
+    def test_diffusion_local(self):
+        hds = HeatDiffusionService()
+        network = networkx.path_graph(1000)
+        network.node[500]['diffusion_input'] = 1.0
+        network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 0.1, solver='local', tol=1e-6)
+        heated = [data for _, data in network.nodes(data=True) if 'diffusion_output_heat' in data]
+        self.assertLess(len(heated), 30)
+        self.assertEqual(network.node[500]['diffusion_output_rank'], 0)
+
+    def test_diffusion_subnetwork(self):
+        hds = HeatDiffusionService()
+        network = networkx.path_graph(100)
+        network.add_edge(200, 201)
+        for node_id in (10, 200):
+            network.node[node_id]['diffusion_input'] = 1.0
+        subnetwork = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.1, top_k=9, output_mode='subnetwork')
+        self.assertEqual(subnetwork.number_of_nodes(), 9)
+        self.assertIn(200, subnetwork)
+        self.assertEqual(subnetwork.number_of_edges(), 7)
+        subnetwork = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.1, top_k=9, output_mode='subnetwork', largest_component=True)
+        self.assertEqual(sorted(subnetwork.nodes()), list(range(7, 14)))
+        subnetwork = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.1, output_mode='subnetwork', heat_threshold=0.01, include_edges=False)
+        self.assertEqual(subnetwork.number_of_edges(), 0)
+        for node_id, data in subnetwork.nodes(data=True):
+            self.assertGreaterEqual(data['diffusion_output_heat'], 0.01)
+
+    def test_diffusion_rwr(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=5)
+        network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 1.0, kernel='rwr', restart_probability=0.4)
+        network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 1.0, kernel='rwr', restart_probability=0.4)
+        self.assertEqual(hds.rwr_solutions.hits, 1)
+        for node_id, data in network.nodes(data=True):
+            self.assertIn('diffusion_output_heat', data)
+            self.assertIn('diffusion_output_rank', data)
+
+    def test_diffusion_permutations(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=5)
+        network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 1.0, num_permutations=20, permutation_seed=3)
+        for node_id, data in network.nodes(data=True):
+            self.assertGreater(data['diffusion_output_p_value'], 0)
+            self.assertLessEqual(data['diffusion_output_p_value'], 1)
+            self.assertIn('diffusion_output_z_score', data)
+
+    def test_weighted_sparse_matrix(self):
+        hds = HeatDiffusionService()
+        network = networkx.MultiGraph()
+        network.add_edge(0, 1, confidence=0.2)
+        network.add_edge(0, 1, confidence=0.6)
+        network.add_edge(1, 2)
+        expected = {'sum': 0.8, 'max': 0.6, 'mean': 0.4}
+        for reduce in ('sum', 'max', 'mean'):
+            matrix = hds.create_sparse_matrix(network, False, weight_key='confidence', reduce=reduce).toarray()
+            self.assertAlmostEqual(matrix[0, 1], -expected[reduce])
+            self.assertAlmostEqual(matrix[1, 2], -1.0)
+            self.assertAlmostEqual(matrix[1, 1], expected[reduce] + 1.0)
+        self.assertEqual(hds.laplacian_cache.misses, 3)
+
+    def test_diffusion_directed(self):
+        hds = HeatDiffusionService()
+        network = networkx.DiGraph()
+        network.add_edges_from([(0, 1), (1, 2), (3, 1)])
+        network.node[1]['diffusion_input'] = 1.0
+        downstream = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 1.0, direction='out')
+        heats = [downstream.node[i]['diffusion_output_heat'] for i in range(4)]
+        self.assertAlmostEqual(heats[0], 0.0)
+        self.assertAlmostEqual(heats[3], 0.0)
+        self.assertGreater(heats[2], 0.0)
+        self.assertAlmostEqual(sum(heats), 1.0)
+        upstream = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 1.0, solver='auto', direction='in')
+        heats = [upstream.node[i]['diffusion_output_heat'] for i in range(4)]
+        self.assertAlmostEqual(heats[2], 0.0)
+        self.assertAlmostEqual(heats[0], heats[3])
+        self.assertGreater(heats[0], 0.0)
+        self.assertEqual(hds.laplacian_cache.misses, 2)
+        self.assertRaises(Exception, hds.diffusion, network, 'diffusion_input', 'diffusion_output', False, 1.0, solver='lanczos', direction='out')
+        self.assertRaises(Exception, hds.diffusion, network.to_undirected(), 'diffusion_input', 'diffusion_output', False, 1.0, direction='out')
+
+    def test_diffusion_components(self):
+        hds = HeatDiffusionService(component_workers=2)
+        network = networkx.disjoint_union(networkx.path_graph(4), networkx.cycle_graph(5))
+        network.node[1]['diffusion_input'] = 1.0
+        expected = hds.diffuse(hds.create_sparse_matrix(network), hds.find_heat(network, 'diffusion_input'), 0.5)
+        for _ in range(2):
+            network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 0.5)
+            for i in range(9):
+                self.assertAlmostEqual(network.node[i]['diffusion_output_heat'], expected[i])
+            self.assertEqual([network.node[i]['diffusion_output_heat'] for i in range(4, 9)], [0.0] * 5)
+        self.assertEqual(hds.components.misses, 1)
+        self.assertEqual(hds.components.hits, 1)
+
+    def test_diffusion_node_order(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=10)
+        expected = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.5)
+        for node_order in ('rcm', 'degree'):
+            reordered = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.5, num_times=2, node_order=node_order)
+            for node_id, data in reordered.nodes_iter(data=True):
+                self.assertAlmostEqual(data['diffusion_output_t0.5_heat'], expected.node[node_id]['diffusion_output_heat'])
+        self.assertEqual(hds.reorderings.misses, 2)
+
+    def test_diffusion_expm_tuning(self):
+        hds = HeatDiffusionService()
+        network = networkx.cycle_graph(30)
+        networkx.set_node_attributes(network, 'diffusion_input', {i: 1.0 if i < 3 else 0.0 for i in range(30)})
+        matrix = hds.create_sparse_matrix(network)
+        expected = hds.diffuse(matrix, hds.find_heat(network, 'diffusion_input'), 0.5)
+        for _ in range(2):
+            network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 0.5)
+            for i, node_id in enumerate(network.nodes()):
+                self.assertAlmostEqual(network.node[node_id]['diffusion_output_heat'], expected[i])
+        self.assertEqual(hds.expm_tunings.misses, 1)
+        self.assertEqual(hds.expm_tunings.hits, 1)
+
+    def test_diffusion_float32(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=10, random_heats=True)
+        expected = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.5)
+        single = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.5, dtype='float32')
+        for node_id, data in single.nodes_iter(data=True):
+            self.assertIsInstance(data['diffusion_output_heat'], float)
+            self.assertAlmostEqual(data['diffusion_output_heat'], expected.node[node_id]['diffusion_output_heat'], places=4)
+        self.assertEqual(hds.laplacian_cache.misses, 2)
+        self.assertRaises(Exception, hds.diffusion, network, 'diffusion_input', 'diffusion_output', False, 0.5, dtype='float16')
+
+    def test_diffusion_dense_kernel(self):
+        directory = tempfile.mkdtemp()
+        try:
+            hds = HeatDiffusionService(kernel_dir=directory)
+            network = create_random_networkx_mock(heats=10, random_heats=True)
+            expected = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.5)
+            key = hds.topology_key(network)
+            hds.kernel_store.save('%s-%d' % key, 0.5, hds.create_sparse_matrix(network, False, key), 'float64')
+            precomputed = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.5, solver='unknown')
+            for node_id, data in precomputed.nodes_iter(data=True):
+                self.assertAlmostEqual(data['diffusion_output_heat'], expected.node[node_id]['diffusion_output_heat'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_diffusion_incremental(self):
+        hds = HeatDiffusionService()
+        network = networkx.convert_node_labels_to_integers(networkx.grid_2d_graph(10, 10))
+        networkx.set_node_attributes(network, 'diffusion_input', {i: 1.0 if i in (0, 55) else 0.0 for i in range(100)})
+        for edit in ([], [(33, 34)], [(70, 71), (80, 81)]):
+            network.remove_edges_from(edit)
+            expected = hds.diffusion(network.copy(), 'diffusion_input', 'diffusion_output', False, 0.5)
+            network = hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 0.5, network_id='grid')
+            for node_id, data in network.nodes_iter(data=True):
+                self.assertAlmostEqual(data['diffusion_output_heat'], expected.node[node_id]['diffusion_output_heat'], places=6)
+        self.assertEqual(hds.incremental.get(('grid', False, None, 'sum', 'undirected')).updates, 2)
+        network.remove_edges_from([(10, 11), (20, 21)])
+        hds.diffusion(network, 'diffusion_input', 'diffusion_output', False, 0.5, network_id='grid', max_edit_nodes=2)
+        self.assertEqual(hds.incremental.get(('grid', False, None, 'sum', 'undirected')).updates, 0)
+
+    def test_laplacian_cache(self):
+        hds = HeatDiffusionService()
+        network = create_random_networkx_mock(heats=50)
+        m1 = hds.create_sparse_matrix(network)
+        m2 = hds.create_sparse_matrix(network.copy())
+        m3 = hds.create_sparse_matrix(network, True)
+        self.assertIs(m1, m2)
+        self.assertIsNot(m1, m3)
+        self.assertEqual(hds.laplacian_cache.hits, 1)
+        self.assertEqual(hds.laplacian_cache.misses, 2)
+
 
 def create_random_networkx_mock(num_nodes=100, num_edges=100, heats=100, random_heats=False):
     n = networkx.Graph()
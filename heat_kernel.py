@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+
+import numpy
+from numpy.lib.format import open_memmap
+
+import solvers
+from cache import LRUCache, DEFAULT_MAX_BYTES
+
+KERNEL_CACHE_MAX_SEEDS = 200
+KERNEL_DTYPES = ('float64', 'float32', 'float16')
+KERNEL_BLOCK_SIZE = 256
+
+class HeatKernelCache(object):
+    """
+    Caches single seed columns of the heat kernel exp(-t * laplacian)
+
+    Diffusion is linear in the input heat, so the diffused heat of any seed set
+    is the heat weighted sum of the columns of its seeds. Columns are cached per
+    network topology and time, and only the missing ones are computed, together
+    in one batch.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_seeds=KERNEL_CACHE_MAX_SEEDS):
+        """
+        Construct a new 'HeatKernelCache' object
+
+        :param max_bytes: The memory budget for cached columns
+        :param max_seeds: Heats with more seeds than this are diffused directly
+        """
+        self.columns = LRUCache(max_bytes)
+        self.max_seeds = max_seeds
+
+    def seeds(self, heat):
+        return numpy.flatnonzero(heat if heat.ndim == 1 else numpy.any(heat, axis=1))
+
+    def accepts(self, heat):
+        return len(self.seeds(heat)) <= self.max_seeds
+
+    def diffuse(self, key, laplacian_factory, heat, time, solver='expm_multiply', tol=None):
+        """
+        Computes exp(-time * laplacian) * heat from cached kernel columns
+
+        :param key: A hashable identifier of the laplacian
+        :param laplacian_factory: A function with no arguments returning the laplacian, called only on a miss
+        :param heat: A heat vector, or a matrix with one heat vector per column
+        :param time: The diffusion time
+        :param solver: The solver used for missing columns
+        :param tol: The accuracy requested from the solver
+        :returns: The diffused heat, shaped like heat
+        """
+        seeds = self.seeds(heat)
+        if len(seeds) == 0:
+            return numpy.zeros(heat.shape)
+        missing = object()
+        columns = {}
+        for seed in seeds:
+            column = self.columns.get((key, time, seed), missing)
+            if column is not missing:
+                columns[seed] = column
+        missing_seeds = [seed for seed in seeds if seed not in columns]
+        if missing_seeds:
+            basis = numpy.zeros((heat.shape[0], len(missing_seeds)))
+            basis[missing_seeds, numpy.arange(len(missing_seeds))] = 1.0
+            computed = solvers.diffuse(laplacian_factory(), basis, [time], solver, tol)[-1]
+            for i, seed in enumerate(missing_seeds):
+                columns[seed] = self.columns.put((key, time, seed), numpy.ascontiguousarray(computed[:, i]))
+        kernel = numpy.column_stack([columns[seed] for seed in seeds])
+        return kernel.dot(heat[seeds])
+
+class KernelStore(object):
+    """
+    Serves dense heat kernels precomputed offline and stored as .npy files
+
+    Row i of a stored kernel is the diffusion of a unit heat on node i, that is
+    column i of exp(-t * laplacian), so a request reads only the rows of its seed
+    nodes and sums them. Kernels are memory mapped read only, so every service
+    process maps the same pages of the file instead of holding its own copy.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Construct a new 'KernelStore' object
+
+        :param directory: The directory kernels are stored in, None for no precomputed kernels
+        """
+        self.directory = directory
+        self.kernels = {}
+        self.lock = threading.Lock()
+
+    def path(self, name, time):
+        return os.path.join(self.directory, '%s-t%r.kernel.npy' % (name, float(time)))
+
+    def get(self, name, time):
+        """
+        Returns the memory mapped kernel stored for a laplacian and time
+
+        :param name: A file name safe identifier of the laplacian
+        :param time: The diffusion time
+        :returns: A read only memory mapped array, or None when no kernel is stored
+        """
+        if self.directory is None:
+            return None
+        path = self.path(name, time)
+        with self.lock:
+            if path in self.kernels:
+                return self.kernels[path]
+        if not os.path.exists(path):
+            return None
+        kernel = numpy.load(path, mmap_mode='r')
+        with self.lock:
+            return self.kernels.setdefault(path, kernel)
+
+    def save(self, name, time, laplacian, dtype='float32', block_size=KERNEL_BLOCK_SIZE, solver='expm_multiply'):
+        """
+        Computes the heat kernel of a laplacian and writes it to the store
+
+        The kernel is computed block_size columns at a time straight into a memory
+        mapped temporary file, which is renamed into place once complete, so
+        memory stays bounded by one block and readers never see a partial kernel.
+
+        :param name: A file name safe identifier of the laplacian
+        :param time: The diffusion time
+        :param laplacian: A square sparse laplacian matrix
+        :param dtype: The type the kernel is stored as, one of float64, float32 or float16
+        :param block_size: The number of kernel columns computed together
+        :param solver: The solver computing the columns
+        :returns: The path of the stored kernel
+        """
+        if dtype not in KERNEL_DTYPES:
+            raise Exception('Unknown kernel dtype ' + str(dtype) + ', expected one of ' + ', '.join(KERNEL_DTYPES))
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        n = laplacian.shape[0]
+        handle, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.npy')
+        os.close(handle)
+        kernel = open_memmap(temporary_path, mode='w+', dtype=dtype, shape=(n, n))
+        for start in range(0, n, block_size):
+            end = min(start + block_size, n)
+            basis = numpy.zeros((n, end - start))
+            basis[numpy.arange(start, end), numpy.arange(end - start)] = 1.0
+            kernel[start:end] = solvers.diffuse(laplacian, basis, [time], solver)[-1].T
+        kernel.flush()
+        del kernel
+        os.chmod(temporary_path, 0o644)
+        path = self.path(name, time)
+        os.rename(temporary_path, path)
+        return path
+
+def diffuse_rows(kernel, heat):
+    """
+    Diffuses heat with a precomputed kernel stored one node per row, reading only the rows of the seed nodes
+
+    :param kernel: A square array whose row i is the diffusion of a unit heat on node i
+    :param heat: A heat vector, or a matrix with one heat vector per column
+    :returns: The diffused heat, shaped like heat
+    """
+    seeds = numpy.flatnonzero(heat if heat.ndim == 1 else numpy.any(heat, axis=1))
+    rows = numpy.asarray(kernel[seeds], dtype=numpy.float64)
+    return rows.T.dot(heat[seeds])
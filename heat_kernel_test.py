@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy
+from scipy.sparse import csc_matrix, diags, random as sparse_random
+from scipy.sparse.linalg import expm_multiply
+
+from heat_kernel import HeatKernelCache, KernelStore, diffuse_rows
+
+class TestHeatKernelCache(unittest.TestCase):
+
+    def setUp(self):
+        adjacency = sparse_random(200, 200, density=0.03, random_state=5)
+        adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+        self.laplacian = csc_matrix(diags(numpy.asarray(adjacency.sum(axis=1)).ravel()) - adjacency)
+        self.calls = 0
+
+    def laplacian_factory(self):
+        self.calls += 1
+        return self.laplacian
+
+    def test_diffuse(self):
+        kernels = HeatKernelCache()
+        heat = numpy.zeros(200)
+        heat[[3, 7, 11]] = [1.0, 2.0, 0.5]
+        expected = expm_multiply(-0.5 * self.laplacian, heat)
+        self.assertTrue(numpy.allclose(kernels.diffuse('network', self.laplacian_factory, heat, 0.5), expected))
+        self.assertTrue(numpy.allclose(kernels.diffuse('network', self.laplacian_factory, heat, 0.5), expected))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(kernels.columns.misses, 3)
+        self.assertEqual(kernels.columns.hits, 3)
+
+    def test_diffuse_missing_columns_only(self):
+        kernels = HeatKernelCache()
+        heat = numpy.zeros((200, 2))
+        heat[3, 0] = 1.0
+        kernels.diffuse('network', self.laplacian_factory, heat, 0.5)
+        heat[8, 1] = 1.0
+        expected = expm_multiply(-0.5 * self.laplacian, heat)
+        self.assertTrue(numpy.allclose(kernels.diffuse('network', self.laplacian_factory, heat, 0.5), expected))
+        self.assertEqual(len(kernels.columns), 2)
+
+    def test_accepts(self):
+        kernels = HeatKernelCache(max_seeds=2)
+        heat = numpy.zeros(200)
+        heat[:2] = 1.0
+        self.assertTrue(kernels.accepts(heat))
+        heat[2] = 1.0
+        self.assertFalse(kernels.accepts(heat))
+
+class TestKernelStore(unittest.TestCase):
+
+    def setUp(self):
+        adjacency = sparse_random(100, 100, density=0.05, random_state=6)
+        adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+        self.laplacian = csc_matrix(diags(numpy.asarray(adjacency.sum(axis=1)).ravel()) - adjacency)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_get(self):
+        store = KernelStore(self.directory)
+        self.assertIsNone(store.get('network', 0.5))
+        store.save('network', 0.5, self.laplacian, 'float64', block_size=30)
+        kernel = store.get('network', 0.5)
+        self.assertIsInstance(kernel, numpy.memmap)
+        self.assertIs(store.get('network', 0.5), kernel)
+        self.assertIsNone(store.get('network', 0.25))
+        heat = numpy.zeros((100, 2))
+        heat[[4, 9], 0] = [1.0, 3.0]
+        heat[50, 1] = 2.0
+        self.assertTrue(numpy.allclose(diffuse_rows(kernel, heat), expm_multiply(-0.5 * self.laplacian, heat)))
+        self.assertTrue(numpy.allclose(diffuse_rows(kernel, heat[:, 0]), expm_multiply(-0.5 * self.laplacian, heat[:, 0])))
+
+    def test_save_float16(self):
+        store = KernelStore(self.directory)
+        store.save('network', 0.5, self.laplacian, 'float16')
+        kernel = store.get('network', 0.5)
+        self.assertEqual(kernel.dtype, numpy.float16)
+        heat = numpy.zeros(100)
+        heat[[1, 2]] = 1.0
+        self.assertTrue(numpy.allclose(diffuse_rows(kernel, heat), expm_multiply(-0.5 * self.laplacian, heat), atol=2e-3))
+        self.assertRaises(Exception, store.save, 'network', 0.5, self.laplacian, 'int8')
+
+if __name__ == '__main__':
+    unittest.main()
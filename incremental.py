@@ -0,0 +1,141 @@
+from __future__ import division
+
+import threading
+from math import exp, lgamma, log
+
+import numpy
+from scipy.sparse import csc_matrix
+
+from cache import nbytes
+from local import MAX_TERMS, _add, _matvec, _prune
+
+DEFAULT_TOL = 1e-6
+MAX_EDIT_NODES = 100
+MAX_UPDATES = 16
+RATE_HEADROOM = 1.25
+DENSE_FRACTION = 0.1
+
+def poisson_weights(rate_time, tol=DEFAULT_TOL):
+    """
+    Returns the Poisson weights of the uniformized series of exp(-time * laplacian)
+
+    :param rate_time: The uniformization rate times the diffusion time
+    :param tol: The largest Poisson mass left out of the series
+    :returns: An array with the weight of every power of the walk matrix
+    """
+    if rate_time == 0:
+        return numpy.ones(1)
+    weights = []
+    cumulative = 0.0
+    while 1.0 - cumulative > tol and len(weights) < MAX_TERMS:
+        k = len(weights)
+        weights.append(exp(k * log(rate_time) - rate_time - lgamma(k + 1)))
+        cumulative += weights[-1]
+    return numpy.array(weights)
+
+class IncrementalDiffusion(object):
+    """
+    The diffused heat of one network, kept so that small edge edits update it
+    instead of diffusing from scratch
+
+    The laplacian is uniformized as L = rate * (I - P), as in local_diffuse, and
+    the walk v_k = P^k * heat is kept for every term of the Poisson series. An
+    edit changes L to L' = L + dL, where dL is nonzero only in the columns of the
+    nodes whose edges changed, so it has low rank. The walk under the new matrix
+    P' = I - L' / rate differs from the old one by d_k, which follows
+
+        d_0 = 0,  d_k+1 = P' * d_k - dL * v_k / rate
+
+    The source term dL * v_k only has entries around the edited nodes, so d_k is
+    a sparse vector that spreads out from them and is pruned like the terms of
+    local_diffuse. Adding the Poisson weighted sum of d_k to the diffused heat
+    gives the exact heat of the edited network up to the pruned mass, and adding
+    every d_k to v_k moves the walk over for the next edit. The cost of an update
+    scales with the edges around the edited nodes rather than the size of the
+    network.
+
+    The walk holds one heat vector per term, about rate * time of them, so this
+    suits a few networks under active editing. The accuracy tol is split evenly
+    between the truncated series and the pruning of up to MAX_UPDATES updates,
+    after which update refuses and the heat has to be diffused from scratch.
+    """
+
+    def __init__(self, laplacian, heat, time, tol=DEFAULT_TOL, nodes=None):
+        """
+        Construct a new 'IncrementalDiffusion' object
+
+        :param laplacian: A square sparse laplacian matrix
+        :param heat: A heat vector
+        :param time: The diffusion time
+        :param tol: The accuracy, relative to the 1-norm of heat
+        :param nodes: The ids of the nodes in the order of the laplacian, for callers to check edits against
+        """
+        self.laplacian = csc_matrix(laplacian, dtype=float)
+        self.heat = numpy.array(heat, dtype=float)
+        self.time = time
+        self.tol = tol
+        self.nodes = nodes
+        self.mass = numpy.abs(self.heat).sum()
+        diagonal = self.laplacian.diagonal()
+        self.rate = RATE_HEADROOM * float(diagonal.max()) if len(diagonal) else 0.0
+        self.weights = poisson_weights(self.rate * time, tol / 2)
+        self.trajectory = numpy.empty((len(self.weights), len(self.heat)))
+        walk = self.heat
+        for k in range(len(self.weights)):
+            self.trajectory[k] = walk
+            if k + 1 < len(self.weights):
+                walk = walk - self.laplacian.dot(walk) / self.rate
+        self.result = self.weights.dot(self.trajectory)
+        self.updates = 0
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self.trajectory.nbytes + self.result.nbytes + self.heat.nbytes + nbytes(self.laplacian)
+
+    def update(self, laplacian, max_edit_nodes=MAX_EDIT_NODES):
+        """
+        Moves the diffused heat over to an edited laplacian on the same nodes
+
+        :param laplacian: The square sparse laplacian matrix of the edited network
+        :param max_edit_nodes: The most nodes whose laplacian columns may change
+        :returns: True if the heat was updated, False if the edit is too large and the heat has to be diffused from scratch
+        """
+        laplacian = csc_matrix(laplacian, dtype=float)
+        if laplacian.shape != self.laplacian.shape:
+            return False
+        delta = csc_matrix(laplacian - self.laplacian)
+        delta.eliminate_zeros()
+        edited = numpy.flatnonzero(numpy.diff(delta.indptr))
+        if len(edited) == 0:
+            self.laplacian = laplacian
+            return True
+        if len(edited) > max_edit_nodes or self.updates >= MAX_UPDATES or laplacian.diagonal().max() > self.rate:
+            return False
+        budget = self.tol * self.mass / (2 * MAX_UPDATES * len(self.weights))
+        indices, values = numpy.array([], dtype=numpy.int64), numpy.array([])
+        correction = None
+        result = self.result.copy()
+        previous = self.trajectory[0, edited]
+        for k in range(1, len(self.weights)):
+            forced_indices, forced_values = _matvec(delta, edited, previous)
+            previous = self.trajectory[k, edited].copy()
+            if correction is None:
+                walked_indices, walked_values = _matvec(laplacian, indices, values)
+                indices, values = _add(indices, values, numpy.concatenate((walked_indices, forced_indices)), -numpy.concatenate((walked_values, forced_values)) / self.rate)
+                indices, values, _ = _prune(indices, values, budget)
+                if len(indices) <= DENSE_FRACTION * len(result):
+                    self.trajectory[k, indices] += values
+                    result[indices] += self.weights[k] * values
+                    continue
+                correction = numpy.zeros(len(result))
+                correction[indices] = values
+            else:
+                correction = correction - laplacian.dot(correction) / self.rate
+                correction[forced_indices] -= forced_values / self.rate
+            self.trajectory[k] += correction
+            result += self.weights[k] * correction
+        self.result = result
+        self.laplacian = laplacian
+        self.updates += 1
+        return True
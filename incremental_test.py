@@ -0,0 +1,45 @@
+import unittest
+
+import networkx
+import numpy
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import expm_multiply
+
+from incremental import IncrementalDiffusion, poisson_weights
+
+class TestIncrementalDiffusion(unittest.TestCase):
+
+    def test_poisson_weights(self):
+        weights = poisson_weights(20.0, 1e-8)
+        self.assertGreater(weights.sum(), 1 - 1e-8)
+        self.assertLess(len(weights), 80)
+        self.assertEqual(list(poisson_weights(0.0)), [1.0])
+
+    def test_update(self):
+        network = networkx.grid_2d_graph(30, 30)
+        laplacian = lambda: csc_matrix(networkx.laplacian_matrix(network), dtype=float)
+        heat = numpy.zeros(900)
+        heat[[0, 450]] = [1.0, 2.0]
+        state = IncrementalDiffusion(laplacian(), heat, 1.0, 1e-8)
+        self.assertLess(numpy.abs(state.result - expm_multiply(-laplacian(), heat)).sum(), 3e-8)
+        for edit in ([(15, 15), (15, 16)], [(0, 0), (0, 1)]):
+            network.remove_edge(*edit)
+            network.add_edge((14, 15), (16, 16))
+            self.assertTrue(state.update(laplacian()))
+            self.assertLess(numpy.abs(state.result - expm_multiply(-laplacian(), heat)).sum(), 3e-8)
+        self.assertEqual(state.updates, 2)
+        self.assertTrue(state.update(laplacian()))
+        self.assertEqual(state.updates, 2)
+
+    def test_refuse(self):
+        network = networkx.path_graph(50)
+        state = IncrementalDiffusion(networkx.laplacian_matrix(network), numpy.ones(50), 0.5)
+        network.add_edges_from([(0, 10), (20, 30)])
+        self.assertFalse(state.update(networkx.laplacian_matrix(network), max_edit_nodes=3))
+        network.add_edges_from([(5, i) for i in range(7, 12)])
+        self.assertFalse(state.update(networkx.laplacian_matrix(network)))
+        self.assertFalse(state.update(networkx.laplacian_matrix(networkx.path_graph(40))))
+        self.assertEqual(state.updates, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+from __future__ import division
+
+import numpy
+from scipy.sparse import coo_matrix, csc_matrix, diags
+
+REDUCTIONS = ('sum', 'max', 'mean')
+DIRECTIONS = ('out', 'in')
+DTYPES = ('float64', 'float32')
+
+def collapse_edges(sources, targets, weights, reduce='sum', directed=False):
+    """
+    Collapses parallel edges into one edge each
+
+    :param sources: An integer array with the source node index of every edge
+    :param targets: An integer array with the target node index of every edge
+    :param weights: An array with the weight of every edge
+    :param reduce: How the weights of parallel edges combine, one of sum, max or mean
+    :param directed: If True, edges in opposite directions are kept apart
+    :returns: A tuple of the source, target and weight arrays of the collapsed edges
+    """
+    if reduce not in REDUCTIONS:
+        raise Exception('Unknown reduction ' + str(reduce) + ', expected one of ' + ', '.join(REDUCTIONS))
+    if directed:
+        low, high = numpy.asarray(sources, dtype=numpy.int64), numpy.asarray(targets, dtype=numpy.int64)
+    else:
+        low = numpy.minimum(sources, targets).astype(numpy.int64)
+        high = numpy.maximum(sources, targets).astype(numpy.int64)
+    pairs = low * (max(low.max(), high.max()) + 1 if len(high) else 1) + high
+    unique, first, inverse = numpy.unique(pairs, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    if reduce == 'max':
+        collapsed = numpy.full(len(unique), -numpy.inf)
+        numpy.maximum.at(collapsed, inverse, weights)
+    else:
+        collapsed = numpy.bincount(inverse, weights=weights, minlength=len(unique))
+        if reduce == 'mean':
+            collapsed /= numpy.bincount(inverse, minlength=len(unique))
+    return low[first], high[first], collapsed
+
+def laplacian_from_edges(sources, targets, num_nodes, weights=None, normalize=False, reduce='sum'):
+    """
+    Builds the laplacian of an undirected, optionally weighted network from edge arrays
+
+    The result matches networkx.laplacian_matrix, or normalized_laplacian_matrix,
+    on the same network, with self loops counted once in the degrees.
+
+    :param sources: An integer array with the source node index of every edge
+    :param targets: An integer array with the target node index of every edge
+    :param num_nodes: The number of nodes
+    :param weights: An array with the weight of every edge, None for unit weights
+    :param normalize: If True, builds the normalized laplacian
+    :param reduce: How the weights of parallel edges combine, one of sum, max or mean
+    :returns: A csc matrix
+    """
+    weights = numpy.ones(len(sources)) if weights is None else numpy.asarray(weights, dtype=float)
+    sources, targets, weights = collapse_edges(numpy.asarray(sources), numpy.asarray(targets), weights, reduce)
+    off_diagonal = sources != targets
+    rows = numpy.concatenate((sources, targets[off_diagonal]))
+    columns = numpy.concatenate((targets, sources[off_diagonal]))
+    values = numpy.concatenate((weights, weights[off_diagonal]))
+    adjacency = coo_matrix((values, (rows, columns)), shape=(num_nodes, num_nodes)).tocsc()
+    degrees = numpy.asarray(adjacency.sum(axis=1)).ravel()
+    laplacian = diags(degrees) - adjacency
+    if normalize:
+        with numpy.errstate(divide='ignore'):
+            scale = 1.0 / numpy.sqrt(degrees)
+        scale[numpy.isinf(scale)] = 0
+        laplacian = diags(scale).dot(laplacian).dot(diags(scale))
+    return csc_matrix(laplacian)
+
+def directed_laplacian_from_edges(sources, targets, num_nodes, weights=None, direction='out', reduce='sum'):
+    """
+    Builds the random walk laplacian of a directed, optionally weighted network from edge arrays
+
+    With direction out, heat flows from the source to the target of every edge and
+    leaves a node split by the weights of its out edges, L = I - A^T * D_out^-1.
+    With direction in, heat flows against the edges, split by in edge weights,
+    L = I - A * D_in^-1. Self loops are ignored, and nodes heat cannot leave keep
+    their heat. The columns of
+    L sum to zero, so total heat is conserved, but L is not symmetric.
+
+    :param sources: An integer array with the source node index of every edge
+    :param targets: An integer array with the target node index of every edge
+    :param num_nodes: The number of nodes
+    :param weights: An array with the weight of every edge, None for unit weights
+    :param direction: out to diffuse along the edges, in to diffuse against them
+    :param reduce: How the weights of parallel edges combine, one of sum, max or mean
+    :returns: A csc matrix
+    """
+    if direction not in DIRECTIONS:
+        raise Exception('Unknown direction ' + str(direction) + ', expected one of ' + ', '.join(DIRECTIONS))
+    weights = numpy.ones(len(sources)) if weights is None else numpy.asarray(weights, dtype=float)
+    sources, targets, weights = collapse_edges(numpy.asarray(sources), numpy.asarray(targets), weights, reduce, directed=True)
+    if direction == 'in':
+        sources, targets = targets, sources
+    loops = sources == targets
+    sources, targets, weights = sources[~loops], targets[~loops], weights[~loops]
+    flow = coo_matrix((weights, (targets, sources)), shape=(num_nodes, num_nodes)).tocsc()
+    degrees = numpy.asarray(flow.sum(axis=0)).ravel()
+    with numpy.errstate(divide='ignore'):
+        scale = 1.0 / degrees
+    scale[numpy.isinf(scale)] = 0
+    return csc_matrix(diags((degrees > 0).astype(float)) - flow.dot(diags(scale)))
@@ -0,0 +1,63 @@
+import unittest
+
+import networkx
+import numpy
+
+from laplacian import collapse_edges, directed_laplacian_from_edges, laplacian_from_edges
+
+class TestLaplacian(unittest.TestCase):
+
+    def setUp(self):
+        self.network = networkx.gnm_random_graph(60, 200, seed=3)
+        self.network.add_edge(5, 5)
+        for i, (source, target) in enumerate(self.network.edges()):
+            self.network[source][target]['weight'] = 0.5 + (i % 7)
+        edges = self.network.edges(data='weight')
+        self.sources = numpy.array([source for source, _, _ in edges])
+        self.targets = numpy.array([target for _, target, _ in edges])
+        self.weights = numpy.array([weight for _, _, weight in edges])
+
+    def test_matches_networkx(self):
+        expected = networkx.laplacian_matrix(self.network, nodelist=range(60)).toarray()
+        actual = laplacian_from_edges(self.sources, self.targets, 60, self.weights).toarray()
+        self.assertTrue(numpy.allclose(actual, expected))
+
+    def test_matches_networkx_normalized(self):
+        expected = networkx.normalized_laplacian_matrix(self.network, nodelist=range(60)).toarray()
+        actual = laplacian_from_edges(self.sources, self.targets, 60, self.weights, normalize=True).toarray()
+        self.assertTrue(numpy.allclose(actual, expected))
+
+    def test_collapse_edges(self):
+        sources = numpy.array([0, 1, 0, 2])
+        targets = numpy.array([1, 0, 1, 3])
+        weights = numpy.array([1.0, 2.0, 6.0, 4.0])
+        for reduce, expected in (('sum', 9.0), ('max', 6.0), ('mean', 3.0)):
+            collapsed_sources, collapsed_targets, collapsed = collapse_edges(sources, targets, weights, reduce)
+            self.assertEqual(list(collapsed_sources), [0, 2])
+            self.assertEqual(list(collapsed_targets), [1, 3])
+            self.assertEqual(list(collapsed), [expected, 4.0])
+        self.assertRaises(Exception, collapse_edges, sources, targets, weights, 'median')
+
+    def test_directed_laplacian(self):
+        sources = numpy.array([0, 0, 1, 2, 2, 3])
+        targets = numpy.array([1, 2, 2, 0, 2, 1])
+        weights = numpy.array([1.0, 3.0, 2.0, 1.0, 5.0, 1.0])
+        adjacency = numpy.zeros((5, 5))
+        adjacency[sources, targets] = weights
+        adjacency[2, 2] = 0
+        for direction, flow in (('out', adjacency.T), ('in', adjacency)):
+            degrees = flow.sum(axis=0)
+            expected = numpy.diag((degrees > 0).astype(float)) - flow / numpy.where(degrees > 0, degrees, 1.0)
+            actual = directed_laplacian_from_edges(sources, targets, 5, weights, direction).toarray()
+            self.assertTrue(numpy.allclose(actual, expected))
+            self.assertTrue(numpy.allclose(actual.sum(axis=0), 0))
+        self.assertRaises(Exception, directed_laplacian_from_edges, sources, targets, 5, weights, 'both')
+
+    def test_collapse_directed_edges(self):
+        sources, targets, weights = collapse_edges(numpy.array([0, 1, 0]), numpy.array([1, 0, 1]), numpy.array([1.0, 2.0, 4.0]), directed=True)
+        self.assertEqual(list(sources), [0, 1])
+        self.assertEqual(list(targets), [1, 0])
+        self.assertEqual(list(weights), [5.0, 2.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+from __future__ import division
+
+from math import exp, lgamma, log
+
+import numpy
+from scipy.sparse import csc_matrix
+
+DEFAULT_EPSILON = 1e-4
+MAX_TERMS = 100000
+
+def local_diffuse(laplacian, heat, time, epsilon=DEFAULT_EPSILON, rate=None):
+    """
+    Approximates exp(-time * laplacian) * heat by a walk that only touches the
+    neighborhood of the seed nodes
+
+    The laplacian is uniformized as L = rate * (I - P), where rate bounds its
+    diagonal, so that exp(-time * L) is the Poisson weighted series of powers of
+    the non negative matrix P. Each term is kept as a sparse vector over the nodes
+    it has reached. The smallest entries of each term are dropped within a budget
+    that totals half of epsilon, and the series stops once the remaining Poisson
+    mass is below the other half. The work therefore scales with the edges around
+    the touched nodes, and with rate * time, rather than with the size of the
+    network.
+
+    For the combinatorial laplacian P is column stochastic, and the returned error
+    bounds the 1-norm distance to the exact diffused heat, which stays within
+    epsilon times the 1-norm of heat unless the series needs unusually many terms.
+
+    :param laplacian: A square sparse laplacian matrix
+    :param heat: A heat vector
+    :param time: The diffusion time
+    :param epsilon: The accuracy, relative to the 1-norm of heat
+    :param rate: An upper bound on the diagonal of the laplacian, computed when None
+    :returns: A tuple of the indices of the nodes with nonzero heat, their heats and the error bound
+    """
+    laplacian = csc_matrix(laplacian)
+    heat = numpy.asarray(heat, dtype=float)
+    indices = numpy.flatnonzero(heat)
+    values = heat[indices]
+    mass = numpy.abs(values).sum()
+    if rate is None:
+        rate = float(laplacian.diagonal().max()) if laplacian.shape[0] else 0.0
+    if rate == 0 or time == 0 or mass == 0:
+        return indices, values, 0.0
+    rate_time = rate * time
+    budget = epsilon * mass / (2 * (rate_time + 6 * rate_time ** 0.5 + 10))
+    weight = exp(-rate_time)
+    cumulative = weight
+    dropped = 0.0
+    result_indices, result_values = indices, weight * values
+    k = 0
+    while 1.0 - cumulative > epsilon / 2 and k < MAX_TERMS and len(indices):
+        k += 1
+        walked_indices, walked_values = _matvec(laplacian, indices, values)
+        indices, values = _add(indices, values, walked_indices, -walked_values / rate)
+        indices, values, dropped_mass = _prune(indices, values, budget)
+        dropped += dropped_mass
+        weight = exp(k * log(rate_time) - rate_time - lgamma(k + 1))
+        cumulative += weight
+        result_indices, result_values = _add(result_indices, result_values, indices, weight * values)
+    error = max(1.0 - cumulative, 0.0) * mass + dropped
+    nonzero = result_values != 0
+    return result_indices[nonzero], result_values[nonzero], error
+
+def _prune(indices, values, budget):
+    """
+    Drops the smallest entries of a sparse vector whose 1-norm totals at most budget
+    """
+    magnitudes = numpy.abs(values)
+    order = numpy.argsort(magnitudes)
+    cumulative = numpy.cumsum(magnitudes[order])
+    cut = numpy.searchsorted(cumulative, budget, side='right')
+    if cut == 0:
+        return indices, values, 0.0
+    keep = numpy.sort(order[cut:])
+    return indices[keep], values[keep], cumulative[cut - 1]
+
+def _matvec(matrix, indices, values):
+    """
+    Multiplies a csc matrix by the sparse vector with the given indices and values,
+    touching only the columns in indices
+    """
+    starts = matrix.indptr[indices]
+    lengths = matrix.indptr[indices + 1] - starts
+    total = lengths.sum()
+    if total == 0:
+        return numpy.array([], dtype=indices.dtype), numpy.array([])
+    positions = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths) + numpy.arange(total)
+    return _combine(matrix.indices[positions], matrix.data[positions] * numpy.repeat(values, lengths))
+
+def _add(indices, values, other_indices, other_values):
+    return _combine(numpy.concatenate((indices, other_indices)), numpy.concatenate((values, other_values)))
+
+def _combine(indices, values):
+    unique, inverse = numpy.unique(indices, return_inverse=True)
+    return unique, numpy.bincount(inverse.ravel(), weights=values, minlength=len(unique))
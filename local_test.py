@@ -0,0 +1,37 @@
+import unittest
+
+import networkx
+import numpy
+from scipy.sparse import csc_matrix, diags, random as sparse_random
+from scipy.sparse.linalg import expm_multiply
+
+from local import local_diffuse
+
+class TestLocalDiffusion(unittest.TestCase):
+
+    def test_accuracy(self):
+        adjacency = sparse_random(300, 300, density=0.02, random_state=11)
+        adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        laplacian = csc_matrix(diags(numpy.asarray(adjacency.sum(axis=1)).ravel()) - adjacency)
+        heat = numpy.zeros(300)
+        heat[[0, 10]] = [1.0, 3.0]
+        for epsilon in (1e-2, 1e-6):
+            indices, values, error = local_diffuse(laplacian, heat, 0.5, epsilon)
+            diffused = numpy.zeros(300)
+            diffused[indices] = values
+            expected = expm_multiply(-0.5 * laplacian, heat)
+            self.assertLessEqual(numpy.abs(diffused - expected).sum(), error + 1e-12)
+            self.assertLessEqual(error, epsilon * 4.0)
+
+    def test_locality(self):
+        laplacian = csc_matrix(networkx.laplacian_matrix(networkx.path_graph(10000)), dtype=float)
+        heat = numpy.zeros(10000)
+        heat[5000] = 1.0
+        indices, values, error = local_diffuse(laplacian, heat, 0.1, 1e-6)
+        self.assertLess(len(indices), 30)
+        self.assertEqual(indices[numpy.argmax(values)], 5000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import numpy
+from scipy.sparse import csr_matrix, issparse
+from scipy.sparse.linalg import LinearOperator
+
+PARALLEL_MIN_NNZ = 1000000
+
+def row_blocks(matrix, num_blocks):
+    """
+    Splits a csr matrix into contiguous row blocks holding about equal numbers of nonzeros
+
+    The blocks are views on the data and indices arrays of matrix, so no nonzeros
+    are copied. They are assigned rather than passed to the csr_matrix constructor,
+    which copies views much smaller than their base.
+
+    :param matrix: A csr matrix
+    :param num_blocks: The number of blocks wanted, fewer are returned for small matrices
+    :returns: A tuple of the row bounds of the blocks, one longer than the blocks, and the list of blocks
+    """
+    indptr = matrix.indptr
+    targets = numpy.linspace(0, indptr[-1], num_blocks + 1)[1:-1]
+    bounds = numpy.unique(numpy.concatenate(([0], numpy.searchsorted(indptr, targets), [matrix.shape[0]])))
+    blocks = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        first, last = indptr[start], indptr[end]
+        block = csr_matrix((end - start, matrix.shape[1]), dtype=matrix.dtype)
+        block.data, block.indices, block.indptr = matrix.data[first:last], matrix.indices[first:last], indptr[start:end + 1] - first
+        blocks.append(block)
+    return bounds, blocks
+
+class ParallelOperator(LinearOperator):
+    """
+    A linear operator multiplying by a sparse matrix one row block per worker
+
+    Every worker writes its rows of the product straight into the shared result.
+    scipy's sparse products release the GIL, so a thread pool runs them on all cores.
+    """
+
+    def __init__(self, matrix, executor, num_blocks):
+        """
+        Construct a new 'ParallelOperator' object
+
+        :param matrix: A square sparse matrix
+        :param executor: A concurrent.futures executor running the row blocks
+        :param num_blocks: The number of row blocks, usually the number of workers of executor
+        """
+        self.matrix = matrix
+        self.executor = executor
+        self.num_blocks = num_blocks
+        rows = csr_matrix(matrix)
+        self.bounds, self.blocks = row_blocks(rows, num_blocks)
+        super(ParallelOperator, self).__init__(rows.dtype, rows.shape)
+
+    def _matmat(self, x):
+        result = numpy.empty((self.shape[0],) + x.shape[1:], dtype=numpy.result_type(self.dtype, x.dtype))
+        def multiply(i):
+            result[self.bounds[i]:self.bounds[i + 1]] = self.blocks[i].dot(x)
+        list(self.executor.map(multiply, range(len(self.blocks))))
+        return result
+
+    _matvec = _matmat
+
+    def _adjoint(self):
+        return ParallelOperator(self.matrix.T, self.executor, self.num_blocks)
+
+    _transpose = _adjoint
+
+    def trace(self):
+        return float(self.matrix.diagonal().sum())
+
+def parallel_operator(matrix, executor, num_blocks, min_nnz=PARALLEL_MIN_NNZ):
+    """
+    Wraps a sparse matrix in a ParallelOperator when it is large enough to gain from it
+
+    :param matrix: A square sparse matrix, or any other operator, which is returned as it is
+    :param executor: A concurrent.futures executor, None to never wrap
+    :param num_blocks: The number of row blocks
+    :param min_nnz: The least number of nonzeros of a wrapped matrix
+    :returns: A ParallelOperator or matrix
+    """
+    if executor is None or num_blocks < 2 or not issparse(matrix) or matrix.nnz < min_nnz:
+        return matrix
+    return ParallelOperator(matrix, executor, num_blocks)
@@ -0,0 +1,59 @@
+import unittest
+from concurrent import futures
+
+import networkx
+import numpy
+from scipy.sparse import csr_matrix
+
+import solvers
+from laplacian import directed_laplacian_from_edges
+from parallel import ParallelOperator, parallel_operator, row_blocks
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        network = networkx.gnm_random_graph(300, 1200, seed=4)
+        self.laplacian = csr_matrix(networkx.laplacian_matrix(network), dtype=float)
+        edges = numpy.array(network.edges())
+        self.directed = directed_laplacian_from_edges(edges[:, 0], edges[:, 1], 300)
+        self.executor = futures.ThreadPoolExecutor(4)
+        self.heat = numpy.zeros((300, 2))
+        self.heat[:5, 0] = 1.0
+        self.heat[100, 1] = 3.0
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_row_blocks(self):
+        bounds, blocks = row_blocks(self.laplacian, 4)
+        self.assertEqual(len(blocks), 4)
+        self.assertEqual(bounds[0], 0)
+        self.assertEqual(bounds[-1], 300)
+        self.assertTrue(all(numpy.shares_memory(block.data, self.laplacian.data) for block in blocks))
+        self.assertTrue(numpy.allclose(numpy.vstack([block.toarray() for block in blocks]), self.laplacian.toarray()))
+
+    def test_products(self):
+        operator = ParallelOperator(self.directed, self.executor, 4)
+        self.assertTrue(numpy.allclose(operator.dot(self.heat), self.directed.dot(self.heat)))
+        self.assertTrue(numpy.allclose(operator.dot(self.heat[:, 0]), self.directed.dot(self.heat[:, 0])))
+        self.assertTrue(numpy.allclose(operator.H.dot(self.heat), self.directed.T.dot(self.heat)))
+        self.assertAlmostEqual(operator.trace(), self.directed.diagonal().sum())
+
+    def test_solvers(self):
+        times = numpy.array([0.25, 0.5, 1.0])
+        for laplacian, names in ((self.laplacian, ('expm_multiply', 'lanczos', 'chebyshev', 'eigen', 'auto')), (self.directed, ('expm_multiply',))):
+            operator = ParallelOperator(laplacian, self.executor, 4)
+            for name in names:
+                expected = solvers.diffuse(laplacian, self.heat, times, name, 1e-10)
+                actual = solvers.diffuse(operator, self.heat, times, name, 1e-10)
+                self.assertTrue(numpy.allclose(actual, expected), name)
+            expected = solvers.diffuse(laplacian, self.heat, [0.5])
+            self.assertTrue(numpy.allclose(solvers.diffuse(operator, self.heat, [0.5]), expected))
+
+    def test_parallel_operator(self):
+        self.assertIs(parallel_operator(self.laplacian, self.executor, 4), self.laplacian)
+        self.assertIs(parallel_operator(self.laplacian, None, 4, min_nnz=0), self.laplacian)
+        self.assertIsInstance(parallel_operator(self.laplacian, self.executor, 4, min_nnz=0), ParallelOperator)
+
+if __name__ == '__main__':
+    unittest.main()
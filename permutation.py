@@ -0,0 +1,82 @@
+from __future__ import division
+
+import numpy
+
+DEFAULT_BIN_SIZE = 100
+DEFAULT_CHUNK_SIZE = 100
+
+def degree_bins(degrees, min_bin_size=DEFAULT_BIN_SIZE):
+    """
+    Groups nodes of similar degree, as in HotNet2
+
+    Nodes are taken in order of degree, nodes of equal degree always share a bin,
+    and a bin is closed once it holds at least min_bin_size nodes.
+
+    :param degrees: An array with the degree of every node
+    :param min_bin_size: The least number of nodes in a bin, the last bin may be smaller
+    :returns: An array with the bin of every node
+    """
+    degrees = numpy.asarray(degrees)
+    order = numpy.argsort(degrees, kind='mergesort')
+    bins = numpy.zeros(len(degrees), dtype=int)
+    current, size = 0, 0
+    for position, node in enumerate(order):
+        if size >= min_bin_size and degrees[node] != degrees[order[position - 1]]:
+            current, size = current + 1, 0
+        bins[node] = current
+        size += 1
+    return bins
+
+def permuted_heats(heat, bins, draws, seed=0):
+    """
+    Draws degree matched random seed sets by shuffling heat within each degree bin
+
+    Every draw is seeded by seed and its own index, so a draw does not depend on
+    how the draws are split into chunks.
+
+    :param heat: A heat vector
+    :param bins: The degree bin of every node
+    :param draws: The indices of the random heat vectors to draw
+    :param seed: The random seed
+    :returns: A matrix with one random heat vector per column
+    """
+    heats = numpy.zeros((len(heat), len(draws)))
+    heated_bins = [numpy.flatnonzero(bins == heated_bin) for heated_bin in numpy.unique(bins[heat != 0])]
+    for column, draw in enumerate(draws):
+        random_state = numpy.random.RandomState([seed, draw])
+        for nodes in heated_bins:
+            heats[nodes, column] = heat[nodes][random_state.permutation(len(nodes))]
+    return heats
+
+def permutation_test(diffuse, heat, diffused_heat, degrees, num_permutations, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, min_bin_size=DEFAULT_BIN_SIZE):
+    """
+    Scores diffused heats against diffusions of degree matched random seed sets
+
+    The random heats are diffused chunk_size at a time as one heat matrix, and only
+    running counts and moments are kept, so memory stays bounded by the chunk.
+
+    :param diffuse: A function diffusing a matrix with one heat vector per column
+    :param heat: The input heat vector
+    :param diffused_heat: The diffused input heat vector
+    :param degrees: An array with the degree of every node
+    :param num_permutations: The number of random seed sets
+    :param seed: The random seed, the same seed draws the same seed sets
+    :param chunk_size: The number of random seed sets diffused together
+    :param min_bin_size: The least number of nodes in a degree bin
+    :returns: A tuple of the empirical p-value and the z-score of every node
+    """
+    bins = degree_bins(degrees, min_bin_size)
+    exceeded = numpy.zeros(len(heat))
+    total = numpy.zeros(len(heat))
+    squared_total = numpy.zeros(len(heat))
+    for start in range(0, num_permutations, chunk_size):
+        draws = range(start, min(start + chunk_size, num_permutations))
+        null = diffuse(permuted_heats(heat, bins, draws, seed))
+        exceeded += (null >= diffused_heat[:, None]).sum(axis=1)
+        total += null.sum(axis=1)
+        squared_total += (null * null).sum(axis=1)
+    p_values = (exceeded + 1) / (num_permutations + 1)
+    mean = total / num_permutations
+    deviation = numpy.sqrt(numpy.maximum(squared_total / num_permutations - mean * mean, 0))
+    z_scores = numpy.where(deviation > 0, (diffused_heat - mean) / numpy.where(deviation > 0, deviation, 1.0), 0.0)
+    return p_values, z_scores
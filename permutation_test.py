@@ -0,0 +1,48 @@
+import unittest
+
+import numpy
+from scipy.sparse import csc_matrix, diags, random as sparse_random
+from scipy.sparse.linalg import expm_multiply
+
+from permutation import degree_bins, permutation_test, permuted_heats
+
+class TestPermutation(unittest.TestCase):
+
+    def setUp(self):
+        adjacency = sparse_random(300, 300, density=0.02, random_state=17)
+        adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        self.degrees = numpy.asarray(adjacency.sum(axis=1)).ravel()
+        self.laplacian = csc_matrix(diags(self.degrees) - adjacency)
+        self.heat = numpy.zeros(300)
+        self.heat[:10] = 1.0
+
+    def test_degree_bins(self):
+        bins = degree_bins(self.degrees, 50)
+        for degree in numpy.unique(self.degrees):
+            self.assertEqual(len(numpy.unique(bins[self.degrees == degree])), 1)
+        for b in numpy.unique(bins)[:-1]:
+            self.assertGreaterEqual((bins == b).sum(), 50)
+
+    def test_permuted_heats(self):
+        bins = degree_bins(self.degrees, 50)
+        heats = permuted_heats(self.heat, bins, range(20), 0)
+        self.assertEqual(heats.shape, (300, 20))
+        self.assertTrue(numpy.array_equal(heats[:, 5:10], permuted_heats(self.heat, bins, range(5, 10), 0)))
+        for column in range(20):
+            for b in numpy.unique(bins):
+                self.assertEqual(heats[bins == b, column].sum(), self.heat[bins == b].sum())
+
+    def test_permutation_test(self):
+        diffuse = lambda heats: expm_multiply(-0.5 * self.laplacian, heats)
+        diffused = diffuse(self.heat)
+        p_values, z_scores = permutation_test(diffuse, self.heat, diffused, self.degrees, 50, seed=1, chunk_size=16)
+        again, _ = permutation_test(diffuse, self.heat, diffused, self.degrees, 50, seed=1, chunk_size=50)
+        self.assertTrue(numpy.array_equal(p_values, again))
+        self.assertTrue(numpy.all((p_values > 0) & (p_values <= 1)))
+        self.assertLess(p_values[:10].mean(), p_values[10:].mean())
+        self.assertGreater(z_scores[:10].mean(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
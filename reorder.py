@@ -0,0 +1,72 @@
+import numpy
+from scipy.sparse import csc_matrix, csr_matrix
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+from cache import nbytes
+
+ORDERINGS = ('none', 'rcm', 'degree')
+
+def node_order(laplacian, ordering='rcm'):
+    """
+    Computes a node order that keeps the nonzeros of a laplacian close to its diagonal
+
+    rcm is the reverse Cuthill-McKee order, which reduces the bandwidth of the
+    matrix, and degree sorts nodes by decreasing degree, keeping hubs together.
+
+    :param laplacian: A square sparse laplacian matrix
+    :param ordering: One of none, rcm or degree
+    :returns: An array with the original index of the node at every new position
+    """
+    if ordering not in ORDERINGS:
+        raise Exception('Unknown node order ' + str(ordering) + ', expected one of ' + ', '.join(ORDERINGS))
+    if ordering == 'none':
+        return numpy.arange(laplacian.shape[0])
+    structure = csr_matrix(abs(laplacian) + abs(laplacian.T))
+    if ordering == 'rcm':
+        return numpy.asarray(reverse_cuthill_mckee(structure, symmetric_mode=True), dtype=numpy.int64)
+    return numpy.argsort(-numpy.diff(structure.indptr), kind='mergesort')
+
+class Reordering(object):
+    """
+    A laplacian with its nodes reordered, and the permutation to move heats in and out of that order
+    """
+
+    def __init__(self, order, laplacian):
+        """
+        Construct a new 'Reordering' object
+
+        :param order: An array with the original index of the node at every new position
+        :param laplacian: The laplacian with its rows and columns in that order
+        """
+        self.order = order
+        self.inverse = numpy.argsort(order)
+        self.laplacian = laplacian
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.inverse.nbytes + nbytes(self.laplacian)
+
+    def permute(self, heat):
+        """
+        Moves a heat vector, or a matrix with one heat vector per column, into the new order
+        """
+        return numpy.asarray(heat)[self.order]
+
+    def restore(self, heats):
+        """
+        Moves diffused heats, with one time per entry of their first axis, back into the original order
+        """
+        return numpy.asarray(heats)[:, self.inverse]
+
+def reorder(laplacian, ordering='rcm'):
+    """
+    Reorders the nodes of a laplacian for locality in sparse products
+
+    :param laplacian: A square sparse laplacian matrix
+    :param ordering: One of none, rcm or degree
+    :returns: A Reordering
+    """
+    order = node_order(laplacian, ordering)
+    permuted = csc_matrix(laplacian[order, :][:, order])
+    permuted.sort_indices()
+    return Reordering(order, permuted)
@@ -0,0 +1,38 @@
+import unittest
+
+import networkx
+import numpy
+from scipy.sparse import csc_matrix
+
+from reorder import node_order, reorder
+
+def bandwidth(matrix):
+    coo = matrix.tocoo()
+    return abs(coo.row - coo.col).max()
+
+class TestReorder(unittest.TestCase):
+
+    def setUp(self):
+        network = networkx.grid_2d_graph(20, 20)
+        nodes = network.nodes()
+        numpy.random.RandomState(0).shuffle(nodes)
+        self.laplacian = csc_matrix(networkx.laplacian_matrix(network, nodelist=nodes), dtype=float)
+
+    def test_node_order(self):
+        for ordering in ('rcm', 'degree'):
+            order = node_order(self.laplacian, ordering)
+            self.assertEqual(sorted(order), list(range(400)))
+        self.assertEqual(list(node_order(self.laplacian, 'none')), list(range(400)))
+        degrees = self.laplacian.diagonal()[node_order(self.laplacian, 'degree')]
+        self.assertTrue(numpy.all(numpy.diff(degrees) <= 0))
+        self.assertRaises(Exception, node_order, self.laplacian, 'random')
+
+    def test_reorder(self):
+        reordering = reorder(self.laplacian, 'rcm')
+        self.assertLess(bandwidth(reordering.laplacian), bandwidth(self.laplacian) / 5)
+        heat = numpy.random.RandomState(1).rand(400, 2)
+        product = reordering.laplacian.dot(reordering.permute(heat))
+        self.assertTrue(numpy.allclose(reordering.restore(product[None])[0], self.laplacian.dot(heat)))
+
+if __name__ == '__main__':
+    unittest.main()
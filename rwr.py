@@ -0,0 +1,75 @@
+from __future__ import division
+
+import numpy
+from scipy.sparse import diags
+
+DEFAULT_RESTART_PROBABILITY = 0.5
+DEFAULT_TOL = 1e-8
+MAX_ITERATIONS = 10000
+
+def random_walk_with_restart(laplacian, heat, restart_probability=DEFAULT_RESTART_PROBABILITY, tol=DEFAULT_TOL, initial=None, method='cg'):
+    """
+    Computes the insulated heat, or random walk with restart, kernel used by HotNet2
+
+        F = b * (I - (1 - b) * W)^-1 * heat
+
+    where b is the restart probability and W = A * D^-1 is the column normalized
+    adjacency matrix recovered from the laplacian L = D - A.
+
+    :param laplacian: A square sparse, unnormalized laplacian matrix
+    :param heat: A heat vector, or a matrix with one heat vector per column
+    :param restart_probability: The probability b of the walk restarting at the heat
+    :param tol: The convergence tolerance, relative to the norm of heat, None for the default
+    :param initial: A previous solution to warm start from, for example on the same network
+    :param method: 'cg' for conjugate gradient on the symmetrized system, 'power' for power iteration
+    :returns: A tuple of the diffused heat, shaped like heat, and the number of iterations
+    """
+    tol = DEFAULT_TOL if tol is None else tol
+    heat = numpy.asarray(heat, dtype=float)
+    degrees = laplacian.diagonal()
+    adjacency = diags(degrees) - laplacian
+    damping = 1.0 - restart_probability
+    if method == 'power':
+        walk = adjacency.dot(diags(1.0 / numpy.where(degrees > 0, degrees, numpy.inf)))
+        return _power_iteration(lambda x: restart_probability * heat + damping * walk.dot(x), heat, tol, initial)
+    if method == 'cg':
+        root_degrees = numpy.sqrt(numpy.where(degrees > 0, degrees, 1.0))
+        symmetric = diags(1.0 / root_degrees).dot(adjacency).dot(diags(1.0 / root_degrees))
+        scale = root_degrees if heat.ndim == 1 else root_degrees[:, None]
+        system = lambda x: x - damping * symmetric.dot(x)
+        initial = None if initial is None else numpy.asarray(initial) / (restart_probability * scale)
+        solution, iterations = _conjugate_gradient(system, heat / scale, tol, initial)
+        return restart_probability * scale * solution, iterations
+    raise Exception('Unknown method ' + str(method) + ', expected cg or power')
+
+def _power_iteration(step, heat, tol, initial=None):
+    current = heat if initial is None else numpy.asarray(initial)
+    threshold = tol * max(numpy.abs(heat).sum(), 1e-300)
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        following = step(current)
+        if numpy.abs(following - current).sum() <= threshold:
+            return following, iteration
+        current = following
+    return current, MAX_ITERATIONS
+
+def _conjugate_gradient(system, right_hand_side, tol, initial=None):
+    """
+    Solves a symmetric positive definite system for every column of right_hand_side at once
+    """
+    solution = numpy.zeros(right_hand_side.shape) if initial is None else numpy.array(initial, dtype=float)
+    residual = right_hand_side - system(solution)
+    direction = residual.copy()
+    residual_norms = (residual * residual).sum(axis=0)
+    thresholds = (tol ** 2) * numpy.maximum((right_hand_side * right_hand_side).sum(axis=0), 1e-300)
+    for iteration in range(MAX_ITERATIONS + 1):
+        if numpy.all(residual_norms <= thresholds):
+            return solution, iteration
+        product = system(direction)
+        curvature = (direction * product).sum(axis=0)
+        step = numpy.where(residual_norms > thresholds, residual_norms / numpy.where(curvature > 0, curvature, 1.0), 0.0)
+        solution = solution + step * direction
+        residual = residual - step * product
+        following_norms = (residual * residual).sum(axis=0)
+        direction = residual + numpy.where(residual_norms > 0, following_norms / numpy.where(residual_norms > 0, residual_norms, 1.0), 0.0) * direction
+        residual_norms = following_norms
+    return solution, MAX_ITERATIONS
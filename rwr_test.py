@@ -0,0 +1,41 @@
+import unittest
+
+import numpy
+from scipy.sparse import csc_matrix, diags, random as sparse_random
+
+from rwr import random_walk_with_restart
+
+class TestRandomWalkWithRestart(unittest.TestCase):
+
+    def setUp(self):
+        adjacency = sparse_random(200, 200, density=0.02, random_state=13)
+        adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        degrees = numpy.asarray(adjacency.sum(axis=1)).ravel()
+        self.laplacian = csc_matrix(diags(degrees) - adjacency)
+        self.heat = numpy.zeros(200)
+        self.heat[:5] = 1.0
+        walk = adjacency.toarray() / numpy.where(degrees > 0, degrees, numpy.inf)
+        self.expected = 0.4 * numpy.linalg.solve(numpy.eye(200) - 0.6 * walk, self.heat)
+
+    def test_methods_agree(self):
+        for method in ('cg', 'power'):
+            diffused, _ = random_walk_with_restart(self.laplacian, self.heat, 0.4, 1e-10, method=method)
+            self.assertTrue(numpy.allclose(diffused, self.expected, atol=1e-8), method)
+
+    def test_heat_matrix(self):
+        heat = numpy.column_stack([self.heat, self.heat[::-1]])
+        diffused, _ = random_walk_with_restart(self.laplacian, heat, 0.4, 1e-10)
+        self.assertEqual(diffused.shape, (200, 2))
+        self.assertTrue(numpy.allclose(diffused[:, 0], self.expected, atol=1e-8))
+
+    def test_warm_start(self):
+        diffused, cold_iterations = random_walk_with_restart(self.laplacian, self.heat, 0.4, 1e-10)
+        warm, warm_iterations = random_walk_with_restart(self.laplacian, self.heat, 0.4, 1e-10, diffused)
+        self.assertLessEqual(warm_iterations, 1)
+        self.assertGreater(cold_iterations, warm_iterations)
+        self.assertTrue(numpy.allclose(warm, self.expected, atol=1e-8))
+
+if __name__ == '__main__':
+    unittest.main()
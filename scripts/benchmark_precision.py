@@ -0,0 +1,83 @@
+"""
+Benchmarks diffusion in float32 and at loose tolerances against the float64 baseline
+
+The network is a Chung-Lu random graph with heavy tailed degrees, like an
+interactome, and a batch of heat vectors, each with a few seed nodes, is diffused
+together. For every setting the script reports the time per batch after the
+expm_multiply parameters are memoized, the memory of the laplacian and heats, and
+how many of the top k nodes of every heat vector agree with the float64 ranking.
+Run it from the top level directory of the repository:
+
+    python scripts/benchmark_precision.py
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import solvers
+from cache import nbytes
+from expm import ExpmTuning
+from laplacian import laplacian_from_edges
+
+SETTINGS = [
+    ('float64', None),
+    ('float64', 1e-6),
+    ('float32', None),
+    ('float32', 1e-4),
+]
+
+def chung_lu_edges(num_nodes, num_edges, exponent=0.5, seed=0):
+    random_state = numpy.random.RandomState(seed)
+    weights = numpy.arange(1, num_nodes + 1) ** -exponent
+    weights /= weights.sum()
+    sources = random_state.choice(num_nodes, num_edges, p=weights)
+    targets = random_state.choice(num_nodes, num_edges, p=weights)
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+def top(heats, k):
+    return numpy.argsort(-heats, axis=0, kind='mergesort')[:k]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=20000, help='The number of nodes')
+    parser.add_argument('--edges', type=int, default=100000, help='The number of edges drawn')
+    parser.add_argument('--columns', type=int, default=16, help='The number of heat vectors diffused together')
+    parser.add_argument('--seeds', type=int, default=20, help='The number of seed nodes of every heat vector')
+    parser.add_argument('--time', type=float, default=0.1, help='The diffusion time')
+    parser.add_argument('--repeats', type=int, default=3, help='The number of batches timed')
+    args = parser.parse_args()
+
+    sources, targets = chung_lu_edges(args.nodes, args.edges)
+    laplacian = laplacian_from_edges(sources, targets, args.nodes)
+    random_state = numpy.random.RandomState(1)
+    heat = numpy.zeros((args.nodes, args.columns))
+    for column in range(args.columns):
+        heat[random_state.choice(args.nodes, args.seeds, replace=False), column] = random_state.rand(args.seeds) + 0.5
+    print('%d nodes, %d edges, %d heat vectors of %d seeds, time %g' % (args.nodes, len(sources), args.columns, args.seeds, args.time))
+
+    baseline = solvers.diffuse(laplacian, heat, [args.time])[0]
+    print('%-8s %8s %10s %10s %12s %10s %10s' % ('dtype', 'tol', 'memory MB', 'batch ms', 'max rel err', 'top 100', 'top 500'))
+    for dtype, tol in SETTINGS:
+        matrix, heats = laplacian.astype(dtype), heat.astype(dtype)
+        tuning = ExpmTuning()
+        diffuse = lambda: solvers.diffuse(matrix, heats, [args.time], 'expm_multiply', tol, tuning)[0]
+        diffused = diffuse()
+        seconds = min(timeit.repeat(diffuse, number=1, repeat=args.repeats))
+        error = numpy.abs(diffused - baseline).max() / numpy.abs(baseline).max()
+        agreement = []
+        for k in (100, 500):
+            expected, actual = top(baseline, k), top(diffused, k)
+            agreement.append(numpy.mean([len(numpy.intersect1d(expected[:, i], actual[:, i])) / float(k) for i in range(args.columns)]))
+        memory = (nbytes(matrix) + heats.nbytes + diffused.nbytes) / 1e6
+        print('%-8s %8s %10.1f %10.1f %12.1e %9.2f%% %9.2f%%' % (dtype, tol or '-', memory, 1000 * seconds, error, 100 * agreement[0], 100 * agreement[1]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmarks sparse products with the laplacian of a large network under each node order
+
+The network is a square lattice with diagonals, about four edges per node, whose
+node labels are shuffled, as real interactomes list their nodes in no useful
+order. Run it from the top level directory of the repository:
+
+    python scripts/benchmark_reordering.py --side 500
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from laplacian import laplacian_from_edges
+from reorder import ORDERINGS, reorder
+
+def lattice_edges(side, seed=0):
+    nodes = numpy.arange(side * side).reshape(side, side)
+    pairs = [
+        (nodes[:, :-1], nodes[:, 1:]),
+        (nodes[:-1, :], nodes[1:, :]),
+        (nodes[:-1, :-1], nodes[1:, 1:]),
+        (nodes[:-1, 1:], nodes[1:, :-1]),
+    ]
+    sources = numpy.concatenate([source.ravel() for source, _ in pairs])
+    targets = numpy.concatenate([target.ravel() for _, target in pairs])
+    labels = numpy.random.RandomState(seed).permutation(side * side)
+    return labels[sources], labels[targets]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--side', type=int, default=500, help='The side of the lattice, 500 gives a million edges')
+    parser.add_argument('--columns', type=int, default=8, help='The number of heat vectors multiplied together')
+    parser.add_argument('--repeats', type=int, default=20, help='The number of products timed')
+    args = parser.parse_args()
+
+    sources, targets = lattice_edges(args.side)
+    num_nodes = args.side * args.side
+    laplacian = laplacian_from_edges(sources, targets, num_nodes)
+    print('%d nodes, %d edges, %d nonzeros' % (num_nodes, len(sources), laplacian.nnz))
+    heats = {1: numpy.random.rand(num_nodes), args.columns: numpy.random.rand(num_nodes, args.columns)}
+
+    baseline = {}
+    print('%-8s %12s %12s %14s %10s' % ('order', 'bandwidth', 'reorder s', 'product ms', 'speedup'))
+    for ordering in ORDERINGS:
+        start = timeit.default_timer()
+        reordering = reorder(laplacian, ordering)
+        elapsed = timeit.default_timer() - start
+        coo = reordering.laplacian.tocoo()
+        bandwidth = abs(coo.row - coo.col).max()
+        for columns, heat in sorted(heats.items()):
+            heat = reordering.permute(heat)
+            seconds = min(timeit.repeat(lambda: reordering.laplacian.dot(heat), number=1, repeat=args.repeats))
+            baseline.setdefault(columns, seconds)
+            label = '%s x%d' % (ordering, columns)
+            print('%-8s %12d %12.2f %14.2f %9.2fx' % (label, bandwidth, elapsed, 1000 * seconds, baseline[columns] / seconds))
+
+if __name__ == '__main__':
+    main()
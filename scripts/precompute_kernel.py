@@ -0,0 +1,56 @@
+"""
+Precomputes the dense heat kernel of a network for the service to memory map
+
+Reads a network from a CX file, computes exp(-time * laplacian) with the
+laplacian the service would build for the same request parameters, and writes it
+to the kernel directory. Point the service's HEAT_DIFFUSION_KERNEL_DIR environment
+variable at that directory and requests against this network and time are
+answered from the kernel. The kernel takes n * n values, 4 bytes each in float32,
+so this suits a few reference networks of up to a few tens of thousands of nodes.
+Run it from the top level directory of the repository:
+
+    python scripts/precompute_kernel.py my_network.cx /data/kernels --time 0.1
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cx_stream
+from heat_diffusion_service import HeatDiffusionService
+from heat_kernel import KERNEL_BLOCK_SIZE, KERNEL_DTYPES, KernelStore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('network', help='The CX file of the network')
+    parser.add_argument('directory', help='The directory the kernel is written to')
+    parser.add_argument('--time', type=float, default=0.1, help='The diffusion time')
+    parser.add_argument('--normalize_laplacian', action='store_true', help='Use the normalized laplacian')
+    parser.add_argument('--edge_weight_attribute_name', default=None, help='The edge attribute holding edge weights')
+    parser.add_argument('--edge_weight_reduce', default='sum', help='How the weights of parallel edges combine')
+    parser.add_argument('--direction', default='undirected', help='undirected, out or in')
+    parser.add_argument('--dtype', default='float32', choices=KERNEL_DTYPES, help='The type the kernel is stored as')
+    parser.add_argument('--block_size', type=int, default=KERNEL_BLOCK_SIZE, help='The number of kernel columns computed together')
+    args = parser.parse_args()
+
+    with open(args.network) as f:
+        aspects = json.load(f)
+    network = cx_stream.read_networkx(
+        cx_stream.cx_elements(aspects),
+        multigraph=args.edge_weight_attribute_name is not None,
+        directed=args.direction != 'undirected',
+    )
+    service = HeatDiffusionService(component_workers=1, matvec_workers=1)
+    key = service.topology_key(network, args.normalize_laplacian, args.edge_weight_attribute_name, args.edge_weight_reduce, args.direction)
+    laplacian = service.create_sparse_matrix(network, args.normalize_laplacian, key, args.edge_weight_attribute_name, args.edge_weight_reduce, args.direction)
+    start = timeit.default_timer()
+    path = KernelStore(args.directory).save('%s-%d' % key, args.time, laplacian, args.dtype, args.block_size)
+    print('%d nodes, kernel written to %s in %.1f s' % (laplacian.shape[0], path, timeit.default_timer() - start))
+
+if __name__ == '__main__':
+    main()
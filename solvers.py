@@ -0,0 +1,247 @@
+from __future__ import division
+
+import numpy
+from scipy.special import ive
+from scipy.sparse import issparse
+from scipy.sparse.linalg import expm_multiply as scipy_expm_multiply
+
+from expm import ExpmTuning, taylor, unit_roundoff
+from local import DEFAULT_EPSILON, local_diffuse
+from parallel import ParallelOperator
+from spectral import Spectrum, compute_spectrum
+
+EIGEN_MAX_NODES = 500
+DENSE_MAX_NODES = 2000
+DENSE_MIN_DENSITY = 0.05
+CHEBYSHEV_MIN_TOL = 1e-6
+DEFAULT_TOL = 1e-10
+LANCZOS_MAX_STEPS = 64
+CHEBYSHEV_MAX_DEGREE = 100000
+
+def diffuse(laplacian, heat, times, solver='expm_multiply', tol=None, tuning=None):
+    """
+    Computes exp(-t * laplacian) * heat for every t in times
+
+    :param laplacian: A square sparse laplacian matrix, or its Spectrum for the spectral solver
+    :param heat: A heat vector, or a matrix with one heat vector per column
+    :param times: An increasing sequence of non negative diffusion times
+    :param solver: The name of a registered solver, or 'auto'
+    :param tol: The requested accuracy, None for the solver's default
+    :param tuning: The ExpmTuning of laplacian, memoizing the parameters of the expm_multiply solver
+    :returns: An array with the diffused heat for each time along its first axis
+    """
+    if solver == 'auto':
+        solver = 'spectral' if isinstance(laplacian, Spectrum) else choose_solver(laplacian, heat, tol)
+    if solver == 'expm_multiply' and tuning is not None:
+        return expm_multiply(laplacian, heat, numpy.asarray(times, dtype=float), tol, tuning)
+    if solver not in SOLVERS:
+        raise Exception('Unknown solver ' + str(solver) + ', expected one of ' + ', '.join(sorted(SOLVERS)) + ' or auto')
+    return SOLVERS[solver](laplacian, heat, numpy.asarray(times, dtype=float), tol)
+
+def choose_solver(laplacian, heat, tol=None):
+    """
+    Picks a solver by node count, density and tolerance
+
+    Small or dense networks are diagonalized outright, loose tolerances use a
+    Chebyshev expansion, and tight tolerances on a single heat vector use Lanczos.
+    Everything else uses scipy's expm_multiply.
+    """
+    n = laplacian.shape[0]
+    density = sparse_matrix(laplacian).nnz / float(n * n) if n else 1.0
+    if n <= EIGEN_MAX_NODES or (n <= DENSE_MAX_NODES and density >= DENSE_MIN_DENSITY):
+        return 'eigen'
+    if not is_symmetric(laplacian):
+        return 'expm_multiply'
+    if tol is not None and tol >= CHEBYSHEV_MIN_TOL:
+        return 'chebyshev'
+    if tol is not None and numpy.ndim(heat) == 1:
+        return 'lanczos'
+    return 'expm_multiply'
+
+def sparse_matrix(laplacian):
+    """
+    Returns the matrix behind a ParallelOperator, for solvers that need its nonzeros
+    rather than only its products
+    """
+    return laplacian.matrix if isinstance(laplacian, ParallelOperator) else laplacian
+
+def is_symmetric(matrix):
+    matrix = sparse_matrix(matrix)
+    difference = matrix - matrix.T
+    return difference.nnz == 0 or abs(difference).max() == 0
+
+def is_evenly_spaced(times):
+    steps = numpy.diff(times)
+    return len(steps) == 0 or numpy.allclose(steps, steps[0])
+
+def stepwise(step):
+    """
+    Adapts a solver for a single time to a sequence of times by diffusing each
+    result forward to the next time
+    """
+    def solver(laplacian, heat, times, tol=None):
+        results = []
+        previous = 0.0
+        for t in times:
+            heat = step(laplacian, heat, t - previous, tol)
+            results.append(heat)
+            previous = t
+        return numpy.array(results)
+    solver.__name__ = step.__name__
+    solver.__doc__ = step.__doc__
+    return solver
+
+def expm_multiply(laplacian, heat, times, tol=None, tuning=None):
+    """
+    The Al-Mohy and Higham truncated Taylor method from scipy, accurate to unit
+    roundoff of the heat's type, or to tol when it is set. Given an ExpmTuning, or
+    a tol, or float32 heats, the series is truncated by memoized parameters and
+    every time is reached by stepping from the previous one.
+    """
+    heat = numpy.asarray(heat, dtype=numpy.result_type(heat, numpy.float32))
+    if tuning is not None or tol is not None or heat.dtype != numpy.float64:
+        tuning = ExpmTuning() if tuning is None else tuning
+        accuracy = max(tol or 0.0, unit_roundoff(heat.dtype))
+        matrix = sparse_matrix(laplacian)
+        columns = 1 if heat.ndim == 1 else heat.shape[1]
+        step = lambda l, h, t, _: taylor(l, h, t, *tuning.parameters(matrix, t, columns, accuracy), tol=accuracy)
+        return stepwise(step)(laplacian, heat, times)
+    if len(times) == 1:
+        return numpy.array([_expm_multiply(laplacian, heat, times[0])])
+    if is_evenly_spaced(times):
+        return _expm_multiply(laplacian, heat, 1.0, start=times[0], stop=times[-1], num=len(times), endpoint=True)
+    return stepwise(lambda l, h, t, _: _expm_multiply(l, h, t))(laplacian, heat, times)
+
+def _expm_multiply(laplacian, heat, time, **kwargs):
+    if isinstance(laplacian, ParallelOperator):
+        kwargs['traceA'] = -time * laplacian.trace()
+    return scipy_expm_multiply(-time * laplacian, heat, **kwargs)
+
+def eigen(laplacian, heat, times, tol=None):
+    """
+    Dense eigendecomposition, exact for any set of times once the network is
+    diagonalized, tol is ignored
+    """
+    laplacian = sparse_matrix(laplacian)
+    dense = laplacian.toarray() if issparse(laplacian) else numpy.asarray(laplacian)
+    if is_symmetric(laplacian):
+        values, vectors = numpy.linalg.eigh(dense)
+        projected = vectors.T.dot(heat)
+        return numpy.array([vectors.dot(_scale(numpy.exp(-t * values), projected)) for t in times])
+    values, vectors = numpy.linalg.eig(dense)
+    projected = numpy.linalg.solve(vectors, heat)
+    return numpy.array([vectors.dot(_scale(numpy.exp(-t * values), projected)).real for t in times])
+
+def spectral(laplacian, heat, times, tol=None):
+    """
+    Diffusion through a precomputed Spectrum, which may be passed in place of the
+    laplacian, tol is ignored
+    """
+    spectrum = laplacian if isinstance(laplacian, Spectrum) else compute_spectrum(sparse_matrix(laplacian))
+    return spectrum.diffuse(heat, times)
+
+def _scale(factors, matrix):
+    return factors * matrix if matrix.ndim == 1 else factors[:, None] * matrix
+
+def _lanczos_step(laplacian, heat, time, tol=None):
+    """
+    Krylov subspace projection onto a Lanczos basis, for symmetric laplacians
+    """
+    if heat.ndim == 2:
+        return numpy.column_stack([_lanczos_step(laplacian, heat[:, i], time, tol) for i in range(heat.shape[1])])
+    if not is_symmetric(laplacian):
+        raise Exception('The lanczos solver requires a symmetric laplacian')
+    tol = DEFAULT_TOL if tol is None else tol
+    heat = numpy.asarray(heat, dtype=float)
+    remaining = time
+    while remaining > 0:
+        norm = numpy.linalg.norm(heat)
+        if norm == 0:
+            break
+        basis, alpha, beta = _lanczos_basis(laplacian, heat / norm, LANCZOS_MAX_STEPS)
+        steps = len(alpha)
+        tridiagonal = numpy.diag(alpha) + numpy.diag(beta[:steps - 1], 1) + numpy.diag(beta[:steps - 1], -1)
+        values, vectors = numpy.linalg.eigh(tridiagonal)
+        tau = remaining
+        while True:
+            coefficients = vectors.dot(numpy.exp(-tau * values) * vectors[0])
+            if beta[steps - 1] * abs(coefficients[-1]) <= tol:
+                break
+            tau /= 2
+        heat = norm * basis.dot(coefficients)
+        remaining -= tau
+    return heat
+
+def _lanczos_basis(matrix, vector, max_steps):
+    n = len(vector)
+    max_steps = min(max_steps, n)
+    basis = numpy.zeros((n, max_steps))
+    alpha = numpy.zeros(max_steps)
+    beta = numpy.zeros(max_steps)
+    basis[:, 0] = vector
+    for j in range(max_steps):
+        w = matrix.dot(basis[:, j])
+        alpha[j] = basis[:, j].dot(w)
+        w -= basis[:, :j + 1].dot(basis[:, :j + 1].T.dot(w))
+        w -= basis[:, :j + 1].dot(basis[:, :j + 1].T.dot(w))
+        beta[j] = numpy.linalg.norm(w)
+        if beta[j] <= 1e-12 * max(1.0, abs(alpha[j])):
+            beta[j] = 0.0
+            return basis[:, :j + 1], alpha[:j + 1], beta[:j + 1]
+        if j + 1 < max_steps:
+            basis[:, j + 1] = w / beta[j]
+    return basis, alpha, beta
+
+def spectral_bound(laplacian):
+    """
+    Returns an upper bound on the eigenvalues of a laplacian by Gershgorin's theorem
+    """
+    return float(abs(sparse_matrix(laplacian)).sum(axis=1).max()) if laplacian.shape[0] else 0.0
+
+def _chebyshev_step(laplacian, heat, time, tol=None):
+    """
+    Truncated Chebyshev expansion of the exponential over the spectral interval
+    of the laplacian
+    """
+    tol = DEFAULT_TOL if tol is None else tol
+    bound = spectral_bound(laplacian)
+    if bound == 0 or time == 0:
+        return numpy.array(heat, dtype=float)
+    half_width = bound / 2.0
+    a = time * half_width
+    shifted = lambda x: laplacian.dot(x) / half_width - x
+    previous = numpy.array(heat, dtype=float)
+    current = shifted(previous)
+    result = ive(0, a) * previous - 2 * ive(1, a) * current
+    for k in range(2, CHEBYSHEV_MAX_DEGREE):
+        previous, current = current, 2 * shifted(current) - previous
+        coefficient = 2 * ive(k, a) * (-1) ** k
+        result += coefficient * current
+        if k > a and abs(coefficient) < tol:
+            break
+    return result
+
+def _local_step(laplacian, heat, time, tol=None):
+    """
+    Approximate walk from the nodes with nonzero heat, tol is the accuracy relative
+    to the total input heat, see local.local_diffuse
+    """
+    if heat.ndim == 2:
+        return numpy.column_stack([_local_step(laplacian, heat[:, i], time, tol) for i in range(heat.shape[1])])
+    indices, values, _ = local_diffuse(sparse_matrix(laplacian), heat, time, DEFAULT_EPSILON if tol is None else tol)
+    diffused = numpy.zeros(laplacian.shape[0])
+    diffused[indices] = values
+    return diffused
+
+lanczos = stepwise(_lanczos_step)
+chebyshev = stepwise(_chebyshev_step)
+local = stepwise(_local_step)
+
+SOLVERS = {
+    'expm_multiply': expm_multiply,
+    'lanczos': lanczos,
+    'chebyshev': chebyshev,
+    'eigen': eigen,
+    'spectral': spectral,
+    'local': local,
+}
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy
+from scipy.sparse import csc_matrix, diags, random as sparse_random
+
+import solvers
+
+class TestSolvers(unittest.TestCase):
+
+    def setUp(self):
+        adjacency = sparse_random(300, 300, density=0.02, random_state=7)
+        adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+        self.laplacian = csc_matrix(diags(numpy.asarray(adjacency.sum(axis=1)).ravel()) - adjacency)
+        self.heat = numpy.zeros(300)
+        self.heat[:10] = 1.0
+        self.times = [0.1, 0.5, 1.0]
+
+    def test_solvers_agree(self):
+        expected = solvers.diffuse(self.laplacian, self.heat, self.times)
+        for name in solvers.SOLVERS:
+            actual = solvers.diffuse(self.laplacian, self.heat, self.times, name, 1e-10)
+            self.assertEqual(actual.shape, (3, 300))
+            self.assertTrue(numpy.allclose(actual, expected, atol=1e-8), name)
+
+    def test_solvers_agree_on_heat_matrix(self):
+        heat = numpy.column_stack([self.heat, self.heat[::-1]])
+        expected = solvers.diffuse(self.laplacian, heat, [1.0])
+        for name in solvers.SOLVERS:
+            actual = solvers.diffuse(self.laplacian, heat, [1.0], name, 1e-10)
+            self.assertEqual(actual.shape, (1, 300, 2))
+            self.assertTrue(numpy.allclose(actual, expected, atol=1e-8), name)
+
+    def test_choose_solver(self):
+        self.assertEqual(solvers.choose_solver(self.laplacian, self.heat), 'eigen')
+        solvers.EIGEN_MAX_NODES, eigen_max_nodes = 100, solvers.EIGEN_MAX_NODES
+        try:
+            self.assertEqual(solvers.choose_solver(self.laplacian, self.heat), 'expm_multiply')
+            self.assertEqual(solvers.choose_solver(self.laplacian, self.heat, 1e-4), 'chebyshev')
+            self.assertEqual(solvers.choose_solver(self.laplacian, self.heat, 1e-10), 'lanczos')
+        finally:
+            solvers.EIGEN_MAX_NODES = eigen_max_nodes
+
+    def test_expm_multiply_precision(self):
+        expected = solvers.diffuse(self.laplacian, self.heat, self.times)
+        single = solvers.diffuse(self.laplacian.astype(numpy.float32), self.heat.astype(numpy.float32), self.times)
+        self.assertEqual(single.dtype, numpy.float32)
+        self.assertTrue(numpy.allclose(single, expected, rtol=1e-5, atol=1e-6))
+        loose = solvers.diffuse(self.laplacian, self.heat, self.times, tol=1e-6)
+        self.assertTrue(numpy.allclose(loose, expected, atol=1e-5))
+
+    def test_unknown_solver(self):
+        self.assertRaises(Exception, solvers.diffuse, self.laplacian, self.heat, [1.0], 'unknown')
+
+if __name__ == '__main__':
+    unittest.main()
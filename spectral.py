@@ -0,0 +1,121 @@
+import os
+import tempfile
+
+import numpy
+from scipy.sparse import issparse
+from scipy.sparse.linalg import eigsh
+
+from cache import LRUCache
+
+SPECTRAL_MAX_NODES = 20000
+SHIFT = 1e-4
+
+class Spectrum(object):
+    """
+    The eigendecomposition of a symmetric laplacian, or its lowest rank eigenpairs
+
+    Once computed, diffusing any heat to any time costs two dense matrix products.
+    """
+
+    def __init__(self, values, vectors):
+        self.values = values
+        self.vectors = vectors
+
+    @property
+    def shape(self):
+        return (self.vectors.shape[0], self.vectors.shape[0])
+
+    @property
+    def rank(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.vectors.nbytes
+
+    def diffuse(self, heat, times):
+        """
+        Computes exp(-t * laplacian) * heat for every t in times
+
+        :param heat: A heat vector, or a matrix with one heat vector per column
+        :param times: A sequence of diffusion times
+        :returns: An array with the diffused heat for each time along its first axis
+        """
+        projected = self.vectors.T.dot(heat)
+        results = []
+        for t in times:
+            factors = numpy.exp(-t * self.values)
+            results.append(self.vectors.dot(factors * projected if projected.ndim == 1 else factors[:, None] * projected))
+        return numpy.array(results)
+
+def compute_spectrum(laplacian, rank=0):
+    """
+    Diagonalizes a symmetric laplacian
+
+    :param laplacian: A square sparse laplacian matrix
+    :param rank: The number of lowest eigenpairs to keep, 0 for all of them
+    :returns: A Spectrum object
+    """
+    n = laplacian.shape[0]
+    if rank and rank < n - 1:
+        values, vectors = eigsh(laplacian, k=rank, sigma=-SHIFT, which='LM')
+        return Spectrum(values, vectors)
+    if n > SPECTRAL_MAX_NODES:
+        raise Exception('Networks with more than ' + str(SPECTRAL_MAX_NODES) + ' nodes need a spectrum_rank')
+    values, vectors = numpy.linalg.eigh(laplacian.toarray() if issparse(laplacian) else laplacian)
+    return Spectrum(values, vectors)
+
+class SpectrumStore(object):
+    """
+    Keeps computed spectra in memory and, given a directory, on disk
+
+    Spectra are written as a pair of .npy files and memory mapped when read back,
+    so a restarted service, or several service processes sharing the directory,
+    do not pay for the decomposition again.
+    """
+
+    def __init__(self, directory=None, cache=None):
+        """
+        Construct a new 'SpectrumStore' object
+
+        :param directory: The directory spectra are persisted in, None to keep them in memory only
+        :param cache: The LRUCache holding spectra in memory
+        """
+        self.directory = directory
+        self.cache = LRUCache() if cache is None else cache
+
+    def get(self, name, laplacian_factory, rank=0):
+        """
+        Returns the spectrum stored under name, computing it on a miss
+
+        :param name: A file name safe identifier of the laplacian
+        :param laplacian_factory: A function with no arguments that returns the laplacian
+        :param rank: The number of lowest eigenpairs to keep, 0 for all of them
+        :returns: A Spectrum object
+        """
+        key = '%s-%d' % (name, rank)
+        return self.cache.get_or_create(key, lambda: self.load(key) or self.save(key, compute_spectrum(laplacian_factory(), rank)))
+
+    def paths(self, key):
+        return os.path.join(self.directory, key + '.values.npy'), os.path.join(self.directory, key + '.vectors.npy')
+
+    def load(self, key):
+        if self.directory is None:
+            return None
+        values_path, vectors_path = self.paths(key)
+        if not os.path.exists(values_path):
+            return None
+        return Spectrum(numpy.load(values_path), numpy.load(vectors_path, mmap_mode='r'))
+
+    def save(self, key, spectrum):
+        if self.directory is None:
+            return spectrum
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        values_path, vectors_path = self.paths(key)
+        for path, values in ((vectors_path, spectrum.vectors), (values_path, spectrum.values)):
+            handle, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.npy')
+            with os.fdopen(handle, 'wb') as f:
+                numpy.save(f, values)
+            os.rename(temporary_path, path)
+        return spectrum
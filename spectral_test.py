@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy
+from scipy.sparse import csc_matrix, diags, random as sparse_random
+from scipy.sparse.linalg import expm_multiply
+
+from spectral import SpectrumStore, compute_spectrum
+
+class TestSpectral(unittest.TestCase):
+
+    def setUp(self):
+        adjacency = sparse_random(200, 200, density=0.03, random_state=3)
+        adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+        self.laplacian = csc_matrix(diags(numpy.asarray(adjacency.sum(axis=1)).ravel()) - adjacency)
+        self.heat = numpy.zeros(200)
+        self.heat[:5] = 1.0
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_full_spectrum(self):
+        spectrum = compute_spectrum(self.laplacian)
+        self.assertEqual(spectrum.rank, 200)
+        for t in (0.1, 1.0):
+            expected = expm_multiply(-t * self.laplacian, self.heat)
+            self.assertTrue(numpy.allclose(spectrum.diffuse(self.heat, [t])[0], expected))
+
+    def test_truncated_spectrum(self):
+        spectrum = compute_spectrum(self.laplacian, 20)
+        self.assertEqual(spectrum.rank, 20)
+        full = compute_spectrum(self.laplacian)
+        self.assertTrue(numpy.allclose(spectrum.values, full.values[:20]))
+
+    def test_store_persists_spectra(self):
+        SpectrumStore(self.directory).get('network', lambda: self.laplacian)
+        def fail():
+            raise AssertionError('spectrum was recomputed')
+        spectrum = SpectrumStore(self.directory).get('network', fail)
+        expected = expm_multiply(-self.laplacian, self.heat)
+        self.assertTrue(numpy.allclose(spectrum.diffuse(self.heat, [1.0])[0], expected))
+
+if __name__ == '__main__':
+    unittest.main()